@@ -0,0 +1,205 @@
+'''
+Batch Mutation Explorer: one reference against thousands of variant assemblies.
+
+The reference is loaded and prepared once (bases, base codes, and its sorted unique k-mers with their
+positions for alignment seeding), then placed in one shared memory block. Every worker in the process
+pool attaches to it read-only, so it is never pickled or re-encoded per task. Tasks carry only the
+variant's file path and byte range; each worker memory-maps the variant file itself for the duration
+of one task, so the number of open files does not grow with the number of variants.
+
+Tasks are submitted in batches, with at most a few batches per worker in flight, and per-variant SNP
+summaries are streamed to a TSV file as each batch completes, so rows are not in input order and one slow
+variant holds back only its own batch.
+
+Usage:
+    python batch_scan.py data/reference-NC_045512.fasta variants/ more.fasta -o summary.tsv --align
+'''
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fasta_reader import index_fasta, iter_fasta, read_record
+from snp_classifier import count_ts_tv
+from snp_finder import find_snps
+from variant_caller import PreparedReference, call_variants_prepared
+
+FASTA_EXTENSIONS = (".fasta", ".fa", ".fna", ".fas")
+
+# Batches in flight per worker; bounds the pending results while keeping every worker busy
+BATCHES_PER_WORKER = 2
+
+COLUMNS = ["file", "record", "length", "snps", "transitions", "transversions", "insertions", "deletions"]
+
+# Worker-side state, set up once per process by _init_worker
+_reference = None
+_reference_memory = None
+_align = False
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+def _shared_size(length, count):
+    return 16 * count + 2 * length
+
+
+def _shared_arrays(buffer, length, count):
+    # Layout of the shared block: unique k-mers (uint64), their positions (int64), bases, base codes
+    kmers = np.ndarray((count,), dtype=np.uint64, buffer=buffer)
+    positions = np.ndarray((count,), dtype=np.int64, buffer=buffer, offset=8 * count)
+    sequence = np.ndarray((length,), dtype=np.uint8, buffer=buffer, offset=16 * count)
+    codes = np.ndarray((length,), dtype=np.uint8, buffer=buffer, offset=16 * count + length)
+    return sequence, codes, kmers, positions
+
+
+def _init_worker(name, length, count, k, align):
+    global _reference, _reference_memory, _align
+    _reference_memory = _attach(name)
+    arrays = _shared_arrays(_reference_memory.buf, length, count)
+    for array in arrays:
+        array.flags.writeable = False
+    _reference = PreparedReference(*arrays, k=k)
+    _align = align
+
+
+def summarize_variant(reference, variant, align=False):
+    """
+    Returns (snps, transitions, transversions, insertions, deletions) for one variant genome.
+
+    :param reference: The reference sequence, or a PreparedReference when scanning many variants.
+    """
+    if align:
+        if not isinstance(reference, PreparedReference):
+            reference = PreparedReference.from_sequence(reference)
+        (_, ref_bases, alt_bases), insertions, deletions = call_variants_prepared(reference, variant)
+    else:
+        if isinstance(reference, PreparedReference):
+            reference = reference.sequence
+        (_, ref_bases, alt_bases), insertions, deletions = find_snps(reference, variant), [], []
+    transitions, transversions = count_ts_tv(ref_bases, alt_bases)
+    return len(ref_bases), transitions, transversions, len(insertions), len(deletions)
+
+
+def _scan_task(task):
+    path, header, start, end = task
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        buffer = np.frombuffer(mapped, dtype=np.uint8)
+        variant = read_record(buffer, start, end)
+        del buffer  # The mmap cannot close while a NumPy view still exports its buffer
+    return (os.path.basename(path), header, len(variant)) + summarize_variant(_reference, variant, _align)
+
+
+def _scan_batch(tasks):
+    return [_scan_task(task) for task in tasks]
+
+
+def find_variant_files(sources):
+    """Expands directories into the FASTA files they contain."""
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(FASTA_EXTENSIONS):
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+
+def _iter_tasks(sources):
+    for path in find_variant_files(sources):
+        if os.path.getsize(path) == 0:
+            continue
+        with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buffer = np.frombuffer(mapped, dtype=np.uint8)
+            records = index_fasta(buffer)
+            del buffer
+        for header, start, end in records:
+            yield path, header, start, end
+
+
+def scan_variants(reference_path, variant_sources, output, workers=None, align=False, chunksize=8):
+    """
+    Scans a reference against every record of every variant FASTA.
+
+    :param reference_path: FASTA file holding the reference (first record is used).
+    :param variant_sources: Iterable of FASTA files and/or directories of FASTA files.
+    :param output: Writable text file; one TSV row is written per variant as results arrive, in completion order.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param align: Use alignment-aware calling (indels) instead of positional comparison.
+    :param chunksize: Variants per task sent to a worker.
+    :return: A tuple (genomes scanned, elapsed seconds).
+    """
+    for _, sequence in iter_fasta(reference_path):
+        reference = sequence
+        break
+    else:
+        raise ValueError(f"No FASTA records found in {reference_path}.")
+
+    prepared = PreparedReference.from_sequence(reference)
+    length, count, k = len(prepared.sequence), len(prepared.kmers), prepared.k
+    memory = shared_memory.SharedMemory(create=True, size=max(_shared_size(length, count), 1))
+    try:
+        for shared, array in zip(_shared_arrays(memory.buf, length, count),
+                                 (prepared.sequence, prepared.codes, prepared.kmers, prepared.positions)):
+            shared[:] = array
+        del reference, prepared, shared
+
+        output.write("\t".join(COLUMNS) + "\n")
+        started = time.perf_counter()
+        scanned = 0
+        workers = workers or os.cpu_count() or 1
+        tasks = _iter_tasks(variant_sources)
+        pending = set()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(memory.name, length, count, k, align)) as executor:
+            while True:
+                while len(pending) < BATCHES_PER_WORKER * workers:
+                    batch = list(islice(tasks, chunksize))
+                    if not batch:
+                        break
+                    pending.add(executor.submit(_scan_batch, batch))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for row in future.result():
+                        output.write("\t".join(str(value) for value in row) + "\n")
+                        scanned += 1
+        return scanned, time.perf_counter() - started
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan one reference genome against many variant genomes.")
+    parser.add_argument("reference", help="Reference genome FASTA")
+    parser.add_argument("variants", nargs="+", help="Variant FASTA files (multi-FASTA allowed) or directories")
+    parser.add_argument("-o", "--output", default="-", help="TSV output path (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--align", action="store_true", help="Align genomes and count indels")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        scanned, elapsed = scan_variants(args.reference, args.variants, output, args.workers, args.align)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    rate = scanned / elapsed if elapsed else float("inf")
+    print(f"Scanned {scanned} genomes in {elapsed:.2f} s ({rate:.1f} genomes/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
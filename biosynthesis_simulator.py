@@ -1,96 +1,81 @@
 import streamlit as st
-import random
-import re
-import requests
-import time  
+import numpy as np
 import os
 
-from pipeline import Pipeline
-from string_reader import StringReader
-from character_capitalizer import CharacterCapitalizer
-from dna_base_converter import DNABaseConverter
-from space_remover import SpaceRemover
-from special_characters_remover import SpecialCharactersRemover
-from draw_molecules import generate_amino_acid_image
+from compiled_pipeline import build_text_to_dna_pipeline, compile_pipeline
 from protein_synthesis import translate_rna_to_protein
+from genetic_codes import GENETIC_CODES
+from mutation_engine import simulate_mutations
+from splice_scanner import exon_coordinates, scan_introns
+from transcription import transcribe
+
+@st.cache_resource
+def get_llm_client():
+    # Imported and checked on the first explanation, so the page (and the app) load without requests or a token
+    from llm_client import DEFAULT_API_URL, ExplanationClient
+
+    token = os.getenv("HUGGINGFACE_TOKEN")
+    if token is None:
+        raise ValueError("❌ Error: Hugging Face API token is missing! Set it as an environment variable.")
+    # One pooled session and on-disk response cache for every explanation on the page
+    return ExplanationClient(api_url=os.getenv("LLM_API_URL", DEFAULT_API_URL), token=token)
+
+EXPLANATION_PROMPTS = {
+    "dna": "What is DNA? Answer in simple, accurate language. Do not use metaphors. Just describe what DNA is, what it's made of, and what it does.",
+    "mutation": "Describe DNA mutations using a construction blueprint analogy.",
+    "transcription": "Explain DNA transcription using a copy machine analogy.",
+    "exons": "Explain what exons are and how they differ from introns, in an educational way.",
+    "translation": "Describe translation (mRNA to protein) using a factory analogy.",
+}
 
-API_URL = "https://api-inference.huggingface.co/models/tiiuae/falcon-7b-instruct"
-HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
+def query_llm(prompt, retries=3):
+    return get_llm_client().explain_many([prompt], retries=retries)[0]
 
-if HF_TOKEN is None:
-    raise ValueError("❌ Error: Hugging Face API token is missing! Set it as an environment variable.")
+def fetch_explanations(retries=3):
+    # All prompts are requested concurrently, so the page waits for about one round-trip (none when cached)
+    answers = get_llm_client().explain_many(list(EXPLANATION_PROMPTS.values()), retries=retries)
+    return dict(zip(EXPLANATION_PROMPTS, answers))
 
-headers = {"Authorization": f"Bearer {HF_TOKEN}"}
+# The stages are stateless, so one staged pipeline is built at import and shared
+TEXT_TO_DNA_PIPELINE = build_text_to_dna_pipeline()
 
-def query_llm(prompt, retries=3):
-    for attempt in range(retries):
-        response = requests.post(API_URL, headers=headers, json={"inputs": prompt})
-
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                full_response = data[0].get("generated_text", "No response text.") if isinstance(data, list) else data.get("generated_text", "No response text.")
-                cleaned_response = re.sub(r'[^\x00-\x7F]+', '', full_response.replace(prompt, "").strip())
-                return cleaned_response
-            except requests.exceptions.JSONDecodeError:
-                return "Error: Response was not in JSON format."
-
-        elif response.status_code in [503, 429]:
-            wait_time = 10 if response.status_code == 503 else 30
-            time.sleep(wait_time)
-
-    return "API is currently unavailable. Please try again later."
-
-def mutate_dna(dna_sequence, mutation_rate):
-    dna_list = list(dna_sequence)
-    mutations_occurred = False
-    for i in range(len(dna_list)):
-        if random.random() < mutation_rate:
-            mutations = {'A': 'CGT', 'C': 'AGT', 'G': 'ACT', 'T': 'ACG'}
-            dna_list[i] = random.choice(mutations[dna_list[i]])
-            mutations_occurred = True
-    return ''.join(dna_list), mutations_occurred
+def mutate_dna(dna_sequence, mutation_rate, rng=None):
+    # Substitutions only, each of the three other bases equally likely; see mutation_engine for indels and Kimura
+    mutated_dna, log = simulate_mutations(dna_sequence, mutation_rate, rng=rng)
+    return mutated_dna, len(log["position"]) > 0
 
 def transcribe_dna_to_rna(dna_sequence):
-    return dna_sequence.replace('T', 'U')
+    # One table lookup per base; a PackedSequence only flips its T/U flag (see transcription)
+    return transcribe(dna_sequence)
 
-def run_pipeline(input_string, mutation_rate=0, prepend_start_codon=False):
-    pipeline = Pipeline()
-    pipeline.add(StringReader())
-    pipeline.add(CharacterCapitalizer())
-    pipeline.add(DNABaseConverter())
-    pipeline.add(SpaceRemover())
-    pipeline.add(SpecialCharactersRemover())
+def run_pipeline(input_string, mutation_rate=0, prepend_start_codon=False, compiled=True, seed=None):
+    # The compiled pipeline fuses the five stages into one pass; seed makes its consonant mapping reproducible
+    rng = np.random.default_rng(seed)
+    if compiled:
+        pipeline = compile_pipeline(TEXT_TO_DNA_PIPELINE, rng=rng)
+    else:
+        pipeline = TEXT_TO_DNA_PIPELINE
 
     original_dna_output = pipeline.execute(input_string)
+
     if prepend_start_codon:
         original_dna_output = 'ATG' + original_dna_output
 
-    mutated_dna_output, mutations_occurred = mutate_dna(original_dna_output, mutation_rate)
+    mutated_dna_output, mutations_occurred = mutate_dna(original_dna_output, mutation_rate, rng=rng)
     return original_dna_output, mutated_dna_output, mutations_occurred
 
 # New: Find introns via GT-AG
-def find_introns_by_splice_sites(dna_sequence):
-    intron_matches = []
-    pattern = re.compile(r'GT(.*?)AG')
-    for match in pattern.finditer(dna_sequence):
-        start = match.start()
-        end = match.end()
-        intron_seq = match.group(0)
-        intron_matches.append((start, end, intron_seq))
-    return intron_matches
+def find_introns_by_splice_sites(dna_sequence, **splice_model):
+    # Leftmost non-overlapping GT...AG, as re.finditer(r'GT(.*?)AG') would; splice_model goes to scan_introns
+    starts, ends = scan_introns(dna_sequence, **splice_model)
+    return [(start, end, dna_sequence[start:end]) for start, end in zip(starts.tolist(), ends.tolist())]
 
 # New: Extract exon segments (regions NOT inside introns)
 def extract_exons(dna_sequence, intron_regions):
-    exons = []
-    last_pos = 0
-    for start, end, _ in intron_regions:
-        if last_pos < start:
-            exons.append((last_pos, start, dna_sequence[last_pos:start]))
-        last_pos = end
-    if last_pos < len(dna_sequence):
-        exons.append((last_pos, len(dna_sequence), dna_sequence[last_pos:]))
-    return exons
+    intron_starts = np.array([start for start, _, _ in intron_regions], dtype=np.int64)
+    intron_ends = np.array([end for _, end, _ in intron_regions], dtype=np.int64)
+    starts, ends = exon_coordinates(len(dna_sequence), intron_starts, intron_ends)
+    return [(start, end, dna_sequence[start:end]) for start, end in zip(starts.tolist(), ends.tolist())]
 
 def app():
     st.markdown(
@@ -229,25 +214,29 @@ def app():
     user_input = st.text_area("Enter your text to convert into DNA:", "Type your text here...")
     mutation_rate = st.slider("Mutation rate (in percentage):", min_value=0.0, max_value=100.0, value=0.0, step=0.1) / 100
     prepend_start_codon = st.checkbox("Prepend 'ATG' to DNA sequence", value=False)
+    genetic_code = st.selectbox("Genetic code (NCBI translation table):", list(GENETIC_CODES),
+                                format_func=lambda table_id: f"{table_id}. {GENETIC_CODES[table_id].name}")
 
     if st.button("Let's Transcribe and Translate!"):
         if user_input:
             original_dna, mutated_dna, mutations_occurred = run_pipeline(user_input, mutation_rate, prepend_start_codon)
 
+            with st.spinner("Reading genetic instructions..."):
+                try:
+                    explanations = fetch_explanations()
+                except ValueError as error:
+                    st.warning(str(error))
+                    explanations = dict.fromkeys(EXPLANATION_PROMPTS, "Explanation unavailable.")
+
             st.subheader("Your DNA Adventure Begins!")
             st.code(original_dna, language="plaintext")
 
-            with st.spinner("Reading genetic instructions..."):
-                explanation_dna = query_llm("What is DNA? Answer in simple, accurate language. Do not use metaphors. Just describe what DNA is, what it's made of, and what it does."
-)
-            st.write(explanation_dna)
+            st.write(explanations["dna"])
 
             st.code(mutated_dna, language="plaintext")
 
-            with st.spinner("Unraveling the mystery of mutations..."):
-                explanation_mutation = query_llm("Describe DNA mutations using a construction blueprint analogy.")
             st.markdown("**Mutations: Altering The Blueprint**")
-            st.write(explanation_mutation)
+            st.write(explanations["mutation"])
 
             # Add a little narrative before we find introns
             st.markdown("""
@@ -277,15 +266,11 @@ def app():
                 st.markdown("**Transcribed RNA (Exon regions only):**")
                 st.code(rna_output, language="plaintext")
 
-                with st.spinner("Writing the script for transcription..."):
-                    explanation_transcription = query_llm("Explain DNA transcription using a copy machine analogy.")
                 st.markdown("**Transcription: A Copy Machine**")
-                st.write(explanation_transcription)
+                st.write(explanations["transcription"])
 
-                with st.spinner("Why did we transcribe only exons?"):
-                    explanation_exons = query_llm("Explain what exons are and how they differ from introns, in an educational way.")
                 st.markdown("**Exons: The Coding Chapters**")
-                st.write(explanation_exons)
+                st.write(explanations["exons"])
 
                 st.markdown("""
                 <div style='font-size: 15px; color: #aaa; background-color: #111; padding: 10px; border-left: 4px solid #ffc72c;'>
@@ -300,7 +285,7 @@ def app():
 
 
                 # Translate exon-derived RNA to protein
-                protein_sequence, stop_codon_present = translate_rna_to_protein(rna_output)
+                protein_sequence, stop_codon_present = translate_rna_to_protein(rna_output, genetic_code)
                 st.markdown("**Protein Product:**")
                 st.code(protein_sequence, language="plaintext")
 
@@ -311,16 +296,39 @@ def app():
 
                 if protein_sequence:
                     with st.spinner("Generating 2D molecular structures..."):
-                        image_path = generate_amino_acid_image(protein_sequence)
-                    if image_path and os.path.exists(image_path):
-                        st.image(image_path, caption="2D Structure of Amino Acids", use_container_width=True)
+                        # RDKit is only loaded when needed
+                        from draw_molecules import MAX_RESIDUES_PER_IMAGE, generate_amino_acid_image, page_count
+                        image_bytes = generate_amino_acid_image(protein_sequence)
+                    if image_bytes:
+                        caption = "2D Structure of Amino Acids"
+                        if page_count(protein_sequence) > 1:
+                            caption += f" (first {MAX_RESIDUES_PER_IMAGE} residues)"
+                        st.image(image_bytes, caption=caption, use_container_width=True)
                     else:
                         st.error("Could not generate amino acid structure image.")
 
-                with st.spinner("Decoding the protein-making process..."):
-                    explanation_translation = query_llm("Describe translation (mRNA to protein) using a factory analogy.")
+                    # The same protein as one peptide-bonded molecule
+                    from peptide_builder import MAX_DRAWN_RESIDUES, build_peptide, draw_peptide, peptide_properties
+                    try:
+                        with st.spinner("Assembling the polypeptide chain..."):
+                            peptide = build_peptide(protein_sequence)
+                            properties = peptide_properties(protein_sequence, peptide)
+                            peptide_image = draw_peptide(peptide, residue_count=properties["residues"])
+                    except ValueError as error:
+                        st.warning(f"Could not assemble the peptide: {error}")
+                    else:
+                        st.markdown("**Polypeptide Chain:**")
+                        columns = st.columns(3)
+                        columns[0].metric("Molecular weight", f"{properties['molecular_weight']:,.1f} Da")
+                        columns[1].metric("Formula", properties["formula"])
+                        columns[2].metric("Net charge", f"{properties['net_charge']:+d}")
+                        if peptide_image:
+                            st.image(peptide_image, caption="Peptide-bonded chain", use_container_width=True)
+                        else:
+                            st.info(f"Chains longer than {MAX_DRAWN_RESIDUES} residues are not drawn.")
+
                 st.markdown("**Translation: The Protein Factory!**")
-                st.write(explanation_translation)
+                st.write(explanations["translation"])
             else:
                 st.warning("No exons found after removing introns.")
         else:
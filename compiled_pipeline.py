@@ -0,0 +1,140 @@
+'''
+Compiled text-to-DNA pipeline.
+
+The five-stage chain StringReader -> CharacterCapitalizer -> DNABaseConverter -> SpaceRemover ->
+SpecialCharactersRemover does, character by character:
+    vowel -> 'A', consonant -> random choice of T/C/G, anything else -> dropped.
+
+The fused stage does the same in one translate pass (bytes.translate for ASCII text, str.translate
+otherwise): vowels become 'A', consonants become a placeholder, everything else is deleted. The placeholders are then replaced in bulk from a seedable
+numpy.random.Generator instead of calling random.choice once per consonant.
+
+Letters are classified on their uppercase form, exactly as in the original chain, so non-ASCII letters
+(e.g. 'é', 'ß') still become consonants.
+'''
+
+import numpy as np
+
+from pipeline import Pipeline
+from string_reader import StringReader
+from character_capitalizer import CharacterCapitalizer
+from dna_base_converter import DNABaseConverter
+from space_remover import SpaceRemover
+from special_characters_remover import SpecialCharactersRemover
+
+VOWELS = 'AEIOU'
+CONSONANT_BASES = np.frombuffer(b'TCG', dtype=np.uint8)
+_PLACEHOLDER = 'N'
+
+# Stage types that the fused stage replaces, in order (StringReader is an identity stage and is dropped)
+FUSABLE_STAGES = (CharacterCapitalizer, DNABaseConverter, SpaceRemover, SpecialCharactersRemover)
+
+
+class _TranslationTable(dict):
+    """str.translate table that classifies characters on first sight and remembers them."""
+
+    def __missing__(self, codepoint):
+        upper = chr(codepoint).upper()
+        if upper in VOWELS:
+            value = 'A'
+        elif upper.isalpha():
+            value = _PLACEHOLDER
+        else:
+            value = None  # Deleted, like spaces and special characters
+        self[codepoint] = value
+        return value
+
+
+_TRANSLATION = _TranslationTable()
+for _codepoint in range(128):
+    _TRANSLATION[_codepoint]
+
+# Equivalent bytes.translate table for the common all-ASCII case
+_ASCII_TABLE = bytes(ord(_TRANSLATION[i] or '\0') for i in range(128)) + bytes(128)
+_ASCII_DELETE = bytes(i for i in range(128) if _TRANSLATION[i] is None)
+
+
+class TextToDNAConverter:
+    """Fused stage equivalent to CharacterCapitalizer + DNABaseConverter + SpaceRemover + SpecialCharactersRemover."""
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def process(self, text):
+        if text.isascii():
+            skeleton = text.encode('ascii').translate(_ASCII_TABLE, _ASCII_DELETE)
+        else:
+            skeleton = text.translate(_TRANSLATION).encode('ascii')
+        bases = np.frombuffer(skeleton, dtype=np.uint8).copy()
+        consonants = np.flatnonzero(bases == ord(_PLACEHOLDER))
+        bases[consonants] = CONSONANT_BASES[self.rng.integers(0, 3, size=len(consonants))]
+        return bases.tobytes().decode('ascii')
+
+
+def compile_pipeline(pipeline, rng=None):
+    """
+    Returns a new Pipeline in which the known text-to-DNA stages are collapsed into one fused stage.
+
+    Identity StringReader stages are dropped. Any other stage is kept as is, so pipelines that do not
+    contain the full known chain are returned unchanged (apart from the dropped readers).
+
+    :param pipeline: The Pipeline to compile.
+    :param rng: numpy.random.Generator (or seed) for the consonant mapping.
+    """
+    if not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+
+    stages = [stage for stage in pipeline.stages if type(stage) is not StringReader]
+    compiled = Pipeline(profile=pipeline.profile)
+    i = 0
+    while i < len(stages):
+        window = stages[i:i + len(FUSABLE_STAGES)]
+        if len(window) == len(FUSABLE_STAGES) and all(type(stage) is expected
+                                                       for stage, expected in zip(window, FUSABLE_STAGES)):
+            compiled.add(TextToDNAConverter(rng))
+            i += len(FUSABLE_STAGES)
+        else:
+            compiled.add(stages[i])
+            i += 1
+    return compiled
+
+
+def build_text_to_dna_pipeline():
+    """Returns the standard five-stage text-to-DNA Pipeline."""
+    pipeline = Pipeline()
+    pipeline.add(StringReader())
+    pipeline.add(CharacterCapitalizer())
+    pipeline.add(DNABaseConverter())
+    pipeline.add(SpaceRemover())
+    pipeline.add(SpecialCharactersRemover())
+    return pipeline
+
+
+# Benchmark on megabyte-scale input
+if __name__ == "__main__":
+    import timeit
+
+    staged = build_text_to_dna_pipeline()
+    fused = compile_pipeline(staged, rng=0)
+
+    samples = {"ascii": "The quick brown fox jumps over the lazy dog! 123 ",
+               "unicode": "The quick brown fox jumps over the lazy dog! Ça va? 123 straße. "}
+    for (label, sample), size_mb in [(item, size) for item in samples.items() for size in (1, 4)]:
+        text = sample * (size_mb * 1024 * 1024 // len(sample))
+        legacy_dna, fused_dna = staged.execute(text), fused.execute(text)
+        assert len(legacy_dna) == len(fused_dna)
+        assert [i for i, base in enumerate(legacy_dna) if base == 'A'] == \
+               [i for i, base in enumerate(fused_dna) if base == 'A']
+
+        runs = 3
+        legacy = timeit.timeit(lambda: staged.execute(text), number=runs) / runs
+        compiled = timeit.timeit(lambda: fused.execute(text), number=runs) / runs
+        print(f"{label:>7} {len(text) / 1e6:.1f} MB | staged {legacy:.3f} s | compiled {compiled:.3f} s "
+              f"| speedup {legacy / compiled:.1f}x")
+
+    # Per-stage breakdown of the staged pipeline
+    staged.profile = True
+    staged.execute(samples["unicode"] * (1024 * 1024 // len(samples["unicode"])))
+    for row in staged.profile_report():
+        print(f"{row['stage']:>26} {row['wall_time_s'] * 1000:9.2f} ms  {row['items_in']:>9} -> {row['items_out']:<9}"
+              f"  peak {row['peak_bytes'] / 1e6:6.2f} MB")
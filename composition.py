@@ -0,0 +1,246 @@
+'''
+Single-pass nucleotide composition.
+
+Every base is encoded as A=0, C=1, G=2, T/U=3 or 4 for anything else (N, IUPAC codes, gaps) with the 256-entry
+BASE_CODES table from packed_sequence, and each overlapping pair of codes as 5 * first + second. One
+np.bincount over the pair indices yields the 5 x 5 dinucleotide table, and everything else follows from it:
+base counts are its row sums (plus the last base), GC/AT skew and CpG observed/expected are ratios of its
+entries. Large sequences are counted in blocks, carrying the pair that straddles two blocks, so the temporary
+memory does not grow with the genome.
+
+Sliding-window GC profiles use cumulative sums: the GC count of the window starting at i is c[i + w] - c[i],
+so a whole-genome track costs O(n) whatever the window size. Windows are normalized by their unambiguous
+bases, so runs of N lower the weight of a window rather than its GC fraction.
+
+Lowercase bases count like uppercase ones and U counts as T.
+'''
+
+import numpy as np
+
+from packed_sequence import AMBIGUOUS, BASE_CODES, PackedSequence
+
+BASES = "ACGT"
+DINUCLEOTIDES = tuple(first + second for first in BASES for second in BASES)
+DEFAULT_WINDOW = 1000
+
+# Bases counted per block, which bounds the temporary memory of counting a large genome
+BLOCK_SIZE = 1 << 22
+
+_SYMBOLS = AMBIGUOUS + 1  # A, C, G, T and "anything else"
+_A, _C, _G, _T = range(4)
+
+
+def _text(sequence):
+    # A sequence the blocks can be sliced from without copying the whole of it more than once
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii", errors="replace")
+    if isinstance(sequence, PackedSequence):
+        return sequence
+    return np.frombuffer(sequence, dtype=np.uint8)
+
+
+def _block_codes(text, start, end):
+    if isinstance(text, PackedSequence):
+        return text[start:end].codes()
+    return BASE_CODES[text[start:end]]
+
+
+def encode(sequence):
+    """Returns the 2-bit code of every base (AMBIGUOUS for anything else) as a uint8 array."""
+    text = _text(sequence)
+    return text.codes() if isinstance(text, PackedSequence) else BASE_CODES[text]
+
+
+def pair_counts(sequence, block_size=BLOCK_SIZE):
+    """
+    Returns (pairs, base_counts): the 5 x 5 table of overlapping dinucleotide counts indexed by code (row = first
+    base) and the 5 base counts, both from a single bincount per block.
+    """
+    text = _text(sequence)
+    pairs = np.zeros(_SYMBOLS * _SYMBOLS, dtype=np.int64)
+    previous = None
+    for start in range(0, len(text), block_size):
+        codes = _block_codes(text, start, start + block_size)
+        if previous is not None:
+            pairs[_SYMBOLS * previous + codes[0]] += 1
+        # At most 5 * 4 + 4 = 24, so the index fits in the codes' own uint8
+        pairs += np.bincount(_SYMBOLS * codes[:-1] + codes[1:], minlength=_SYMBOLS * _SYMBOLS)
+        previous = int(codes[-1])
+    pairs = pairs.reshape(_SYMBOLS, _SYMBOLS)
+    bases = pairs.sum(axis=1)
+    if previous is not None:
+        bases[previous] += 1
+    return pairs, bases
+
+
+def _ratio(numerator, denominator):
+    # Like DNAAnalyzer.compute_gc_percentage, an empty denominator gives 0 rather than an error
+    return numerator / denominator if denominator else 0.0
+
+
+def composition(sequence, block_size=BLOCK_SIZE):
+    """
+    Computes the composition of a DNA/RNA sequence in one pass.
+
+    :param sequence: str, bytes-like or PackedSequence.
+    :return: dict with
+             length: number of bases, ambiguous ones included;
+             counts: {A, C, G, T, N} counts, N standing for every non-ACGTU byte;
+             gc_percentage: 100 * (G + C) / length, as DNAAnalyzer.compute_gc_percentage;
+             gc_skew: (G - C) / (G + C); at_skew: (A - T) / (A + T);
+             cpg_observed_expected: CpG * L / (C * G) with L the number of unambiguous bases;
+             dinucleotides: {"AA": count, ...} for the 16 unambiguous overlapping pairs.
+             Ratios with an empty denominator are 0.
+    """
+    pairs, bases = pair_counts(sequence, block_size)
+    a, c, g, t, other = (int(count) for count in bases)
+    length = a + c + g + t + other
+    return {
+        "length": length,
+        "counts": {"A": a, "C": c, "G": g, "T": t, "N": other},
+        "gc_percentage": _ratio(100 * (g + c), length),
+        "gc_skew": _ratio(g - c, g + c),
+        "at_skew": _ratio(a - t, a + t),
+        "cpg_observed_expected": _ratio(int(pairs[_C, _G]) * (length - other), c * g),
+        "dinucleotides": dict(zip(DINUCLEOTIDES, pairs[:4, :4].ravel().tolist())),
+    }
+
+
+def dinucleotide_frequencies(dinucleotides):
+    """Turns the dinucleotide counts of composition() into frequencies summing to 1 (all 0 if there are none)."""
+    total = sum(dinucleotides.values())
+    return {pair: _ratio(count, total) for pair, count in dinucleotides.items()}
+
+
+def _window_totals(mask, window, starts):
+    # Number of True values in each window, from one cumulative sum (int32 while it cannot overflow)
+    totals = np.zeros(len(mask) + 1, dtype=np.int32 if len(mask) < 2 ** 31 else np.int64)
+    np.cumsum(mask, out=totals[1:])
+    return totals[starts + window] - totals[starts]
+
+
+def _window_starts(length, window, step):
+    if window < 1 or step < 1:
+        raise ValueError("window and step must be positive")
+    return np.arange(0, max(length - window + 1, 0), step)
+
+
+def gc_profile(sequence, window=DEFAULT_WINDOW, step=1):
+    """
+    Sliding-window GC fraction.
+
+    :param sequence: str, bytes-like or PackedSequence.
+    :param window: Window length in bases.
+    :param step: Distance between consecutive window starts.
+    :return: (starts, gc) arrays; gc is the fraction of G/C among the window's unambiguous bases (NaN if none).
+             Sequences shorter than the window give empty arrays.
+    """
+    codes = encode(sequence)
+    starts = _window_starts(len(codes), window, step)
+    gc = _window_totals((codes == _C) | (codes == _G), window, starts)
+    known = _window_totals(codes < AMBIGUOUS, window, starts) if (codes == AMBIGUOUS).any() else window
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return starts, np.where(known > 0, gc / known, np.nan)
+
+
+def gc_skew_profile(sequence, window=DEFAULT_WINDOW, step=1):
+    """Sliding-window GC skew (G - C) / (G + C), as (starts, skew) arrays (NaN for windows without G or C)."""
+    codes = encode(sequence)
+    starts = _window_starts(len(codes), window, step)
+    g = _window_totals(codes == _G, window, starts)
+    c = _window_totals(codes == _C, window, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return starts, np.where(g + c > 0, (g - c) / (g + c), np.nan)
+
+
+class DNAAnalyzer:
+    """
+    The Stability Matrix lesson's DNAAnalyzer, backed by one composition() pass that is computed on first use
+    and shared by every method.
+    """
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self._composition = None
+
+    @property
+    def composition(self):
+        if self._composition is None:
+            self._composition = composition(self.sequence)
+        return self._composition
+
+    def count_cytosine(self):
+        return self.composition["counts"]["C"]
+
+    def count_guanine(self):
+        return self.composition["counts"]["G"]
+
+    def sequence_length(self):
+        return self.composition["length"]
+
+    def compute_gc_percentage(self):
+        return self.composition["gc_percentage"]
+
+    def gc_skew(self):
+        return self.composition["gc_skew"]
+
+    def at_skew(self):
+        return self.composition["at_skew"]
+
+    def cpg_observed_expected(self):
+        return self.composition["cpg_observed_expected"]
+
+    def dinucleotide_frequencies(self):
+        return dinucleotide_frequencies(self.composition["dinucleotides"])
+
+    def gc_profile(self, window=DEFAULT_WINDOW, step=1):
+        return gc_profile(self.sequence, window, step)
+
+
+class _CountingDNAAnalyzer:
+    # The lesson's solution (one str.count scan per base), kept for benchmarking.
+    def __init__(self, sequence):
+        self.sequence = sequence.upper()
+
+    def compute_gc_percentage(self):
+        total_length = len(self.sequence)
+        if total_length == 0:
+            return 0
+        return ((self.sequence.count('G') + self.sequence.count('C')) / total_length) * 100
+
+    def composition(self):
+        counts = {base: self.sequence.count(base) for base in BASES}
+        dinucleotides = {pair: sum(1 for i in range(len(self.sequence) - 1) if self.sequence.startswith(pair, i))
+                         for pair in DINUCLEOTIDES}
+        return counts, dinucleotides
+
+
+def _gc_profile_loop(sequence, window=DEFAULT_WINDOW, step=1):
+    # One count per window, kept for benchmarking.
+    return [(sequence.count('G', i, i + window) + sequence.count('C', i, i + window)) / window
+            for i in range(0, len(sequence) - window + 1, step)]
+
+
+# Benchmark against the counting DNAAnalyzer on random DNA
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    for length in (100_000, 1_000_000, 30_000_000):
+        sequence = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, size=length)].tobytes().decode("ascii")
+        result = composition(sequence)
+        assert np.isclose(result["gc_percentage"], _CountingDNAAnalyzer(sequence).compute_gc_percentage())
+        if length <= 100_000:
+            counts, dinucleotides = _CountingDNAAnalyzer(sequence).composition()
+            assert counts == {base: result["counts"][base] for base in BASES}
+            assert dinucleotides == result["dinucleotides"]
+            assert np.allclose(gc_profile(sequence, 100)[1], _gc_profile_loop(sequence, 100))
+
+        runs = 3
+        counting = timeit.timeit(lambda: _CountingDNAAnalyzer(sequence).compute_gc_percentage(), number=runs) / runs
+        engine = timeit.timeit(lambda: composition(sequence), number=runs) / runs
+        track = timeit.timeit(lambda: gc_profile(sequence, DEFAULT_WINDOW), number=runs) / runs
+        subset = sequence[:min(length, 1_000_000)]
+        loop = timeit.timeit(lambda: _gc_profile_loop(subset, DEFAULT_WINDOW), number=1) * length / len(subset)
+        print(f"{length:>11,} bp | GC% by str.count {counting * 1000:7.1f} ms | full composition {engine * 1000:7.1f} ms"
+              f" | {DEFAULT_WINDOW} bp GC track: cumsum {track * 1000:7.1f} ms, per-window count ~{loop:.2f} s")
@@ -1,7 +1,17 @@
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image
 from rdkit import Chem
 from rdkit.Chem import Draw
-import streamlit as st
-import os
+
+from residues import to_one_letter
+
+DEFAULT_TILE_SIZE = (200, 200)
+THUMBNAIL_TILE_SIZE = (80, 80)
+DEFAULT_MOLS_PER_ROW = 4
+# Residues drawn per image (one page); longer proteins are paged so one request never renders them all
+MAX_RESIDUES_PER_IMAGE = 48
 
 # Dictionary mapping one-letter amino acid codes to SMILES notation
 aa_smiles = {
@@ -27,25 +37,107 @@ aa_smiles = {
     "V": "CC(C)C(C(=O)O)N"    # Valine
 }
 
-def generate_amino_acid_image(sequence, filename="amino_acids.png"):
+# Parsed once at import; Mol objects are only read from here on
+amino_acid_mols = {aa: Chem.MolFromSmiles(smiles) for aa, smiles in aa_smiles.items()}
+
+
+@lru_cache(maxsize=256)
+def render_tile(aa, tile_size=DEFAULT_TILE_SIZE):
     """
-    Generates a 2D image of the amino acid sequence using RDKit and saves it.
+    Returns the cached, legend-labelled 2D drawing of one amino acid as a PIL image.
+    Tiles are shared between calls and must not be modified.
     """
-    mols = [Chem.MolFromSmiles(aa_smiles[aa]) for aa in sequence if aa in aa_smiles]
+    return Draw.MolToImage(amino_acid_mols[aa], size=tile_size, legend=aa).convert("RGB")
+
+
+def compose_grid(tiles, mols_per_row=DEFAULT_MOLS_PER_ROW, tile_size=DEFAULT_TILE_SIZE):
+    """Pastes equally sized tiles into a white grid image, row by row."""
+    rows = -(-len(tiles) // mols_per_row)
+    width, height = tile_size
+    grid = Image.new("RGB", (width * min(mols_per_row, len(tiles)), height * rows), "white")
+    for i, tile in enumerate(tiles):
+        grid.paste(tile, ((i % mols_per_row) * width, (i // mols_per_row) * height))
+    return grid
+
+
+def drawable_residues(sequence):
+    """Returns the residues of a protein (three-letter names or one-letter codes) that can be drawn, as one-letter codes."""
+    return "".join(aa for aa in to_one_letter(sequence) if aa in amino_acid_mols)
+
+
+def page_count(sequence, max_residues=MAX_RESIDUES_PER_IMAGE):
+    """Returns how many images generate_amino_acid_image needs to show the whole protein."""
+    return -(-len(drawable_residues(sequence)) // max_residues)
 
-    if not mols:
+
+def generate_amino_acid_image(sequence, mols_per_row=DEFAULT_MOLS_PER_ROW, tile_size=DEFAULT_TILE_SIZE,
+                              image_format="PNG", max_residues=MAX_RESIDUES_PER_IMAGE, page=0):
+    """
+    Generates a 2D image of the amino acid sequence using RDKit.
+    The sequence may be three-letter names ("Met Ala", as returned by translate_rna_to_protein) or one-letter
+    codes. At most max_residues are drawn, starting at residue page * max_residues; use page_count to page
+    through long proteins and THUMBNAIL_TILE_SIZE for compact overviews.
+    Returns the encoded image as bytes (None if the page has no drawable amino acids), so concurrent
+    sessions never share a file on disk.
+    """
+    if max_residues < 1:
+        raise ValueError("max_residues must be at least 1")
+    residues = drawable_residues(sequence)[page * max_residues:(page + 1) * max_residues]
+
+    if not residues:
         print("Error: No valid amino acids found in sequence!")
         return None
 
-    img = Draw.MolsToGridImage(mols, molsPerRow=4, subImgSize=(200,200), legends=[aa for aa in sequence if aa in aa_smiles])
+    return _encode_grid(residues, mols_per_row, tuple(tile_size), image_format)  # st.image accepts the bytes directly
+
 
-    img_path = os.path.join(os.getcwd(), filename)
-    img.save(img_path)
+@lru_cache(maxsize=32)
+def _encode_grid(residues, mols_per_row, tile_size, image_format):
+    # Streamlit reruns redraw the same protein; the encoded bytes are immutable and safe to share
+    grid = compose_grid([render_tile(aa, tile_size) for aa in residues], mols_per_row, tile_size)
+    buffer = BytesIO()
+    # Encoding dominates the cost; the fastest PNG compression is ~40% quicker for ~10% more bytes
+    options = {"compress_level": 1} if image_format.upper() == "PNG" else {}
+    grid.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
 
-    return img_path  # Return file path for Streamlit display
 
-# Test the function
+def _generate_amino_acid_image_legacy(sequence, mols_per_row=DEFAULT_MOLS_PER_ROW, tile_size=DEFAULT_TILE_SIZE):
+    # The original implementation (parse every SMILES, render the whole grid), kept for benchmarking.
+    mols = [Chem.MolFromSmiles(aa_smiles[aa]) for aa in sequence if aa in aa_smiles]
+    img = Draw.MolsToGridImage(mols, molsPerRow=mols_per_row, subImgSize=tile_size,
+                               legends=[aa for aa in sequence if aa in aa_smiles])
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# Benchmark against re-parsing and re-rendering on every call
 if __name__ == "__main__":
+    import timeit
+
     test_sequence = "MVTTTY"
-    output_img = generate_amino_acid_image(test_sequence)
-    print(f"Amino acid structure image saved at: {output_img}")
+    with open("amino_acids.png", "wb") as image_file:
+        image_file.write(generate_amino_acid_image(test_sequence))
+    print("Amino acid structure image saved at: amino_acids.png")
+
+    for sequence in (test_sequence, "MFVFLVLLPLVSSQCVNLTTRTQLPPAYTNSFTRGVYYPDKVFRSSVLHSTQDLFLPFFSNVTWFHAIHVSG"):
+        runs = 5
+        legacy = timeit.timeit(lambda: _generate_amino_acid_image_legacy(sequence), number=runs) / runs
+        tiles = timeit.timeit(lambda: (_encode_grid.cache_clear(),
+                                       generate_amino_acid_image(sequence, max_residues=len(sequence))),
+                              number=runs) / runs
+        repeat = timeit.timeit(lambda: generate_amino_acid_image(sequence, max_residues=len(sequence)),
+                               number=runs) / runs
+        print(f"{len(sequence):>3} residues | re-render {legacy * 1000:7.1f} ms | cached tiles {tiles * 1000:6.1f} ms "
+              f"| repeated sequence {repeat * 1000:6.3f} ms")
+
+    # A translated genome-sized protein only costs one page
+    protein = " ".join(["Met", "Ala", "Trp", "Gly"] * 5000)
+    runs = 5
+    paged = timeit.timeit(lambda: (_encode_grid.cache_clear(), generate_amino_acid_image(protein)), number=runs) / runs
+    thumbnail = timeit.timeit(lambda: (_encode_grid.cache_clear(),
+                                       generate_amino_acid_image(protein, tile_size=THUMBNAIL_TILE_SIZE)),
+                              number=runs) / runs
+    print(f"20,000 residues (three-letter) | {page_count(protein):,} pages | first page {paged * 1000:6.1f} ms "
+          f"| thumbnail page {thumbnail * 1000:6.1f} ms")
@@ -0,0 +1,147 @@
+'''
+Streaming FASTA reader that works directly on bytes.
+
+Files on disk are memory-mapped, uploads are read through their existing buffer, and each record's
+sequence is copied exactly once: line breaks are stripped block by block into a single contiguous
+uint8 NumPy array. No intermediate Python strings are built for the sequence data, and multi-record
+files are supported.
+'''
+
+import mmap
+import os
+
+import numpy as np
+
+# Bytes scanned or copied per block while indexing records and stripping line breaks; bounds the
+# temporary mask size.
+BLOCK_SIZE = 1 << 24
+
+_NEWLINE = ord("\n")
+_HEADER = ord(">")
+
+
+def as_buffer(data):
+    """Returns a uint8 array over bytes-like data or a binary file-like object, without copying where possible."""
+    # Streamlit's UploadedFile and io.BytesIO expose their storage without copying
+    if hasattr(data, "getbuffer"):
+        data = data.getbuffer()
+    elif hasattr(data, "read"):
+        data = data.read()
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _find_byte(buffer, value, start):
+    # Position of the first `value` at or after start (len(buffer) if none), searched in growing windows
+    window = 256
+    while start < len(buffer):
+        hits = np.flatnonzero(buffer[start:start + window] == value)
+        if len(hits):
+            return start + int(hits[0])
+        start += window
+        window = min(window * 2, BLOCK_SIZE)
+    return len(buffer)
+
+
+def index_fasta(buffer):
+    """
+    Locates the records of a FASTA file held in a uint8 array.
+
+    :param buffer: The raw file contents as a uint8 NumPy array.
+    :return: A list of (header, seq_start, seq_end) tuples. The byte range [seq_start, seq_end)
+             still contains line breaks; pass it to read_record to get the bases.
+    """
+    # '>' markers are collected block by block; only a '>' at the start of a line opens a record
+    record_starts = []
+    for block_start in range(0, len(buffer), BLOCK_SIZE):
+        markers = np.flatnonzero(buffer[block_start:block_start + BLOCK_SIZE] == _HEADER) + block_start
+        line_start = np.ones(len(markers), dtype=bool)
+        inner = markers > 0
+        line_start[inner] = buffer[markers[inner] - 1] == _NEWLINE
+        record_starts.append(markers[line_start])
+    starts = np.concatenate(record_starts) if record_starts else np.empty(0, dtype=np.int64)
+
+    records = []
+    for i, start in enumerate(starts.tolist()):
+        header_end = _find_byte(buffer, _NEWLINE, start)
+        header = buffer[start + 1:header_end].tobytes().decode("utf-8", errors="replace").strip()
+        seq_end = int(starts[i + 1]) if i + 1 < len(starts) else len(buffer)
+        records.append((header, min(header_end + 1, seq_end), seq_end))
+    return records
+
+
+def read_record(buffer, start, end):
+    """Copies buffer[start:end] into a new contiguous uint8 array with all whitespace removed."""
+    sequence = np.empty(end - start, dtype=np.uint8)
+    length = 0
+    for block_start in range(start, end, BLOCK_SIZE):
+        block = buffer[block_start:min(block_start + BLOCK_SIZE, end)]
+        bases = block[block > 32]  # Drops \n, \r, spaces and tabs
+        sequence[length:length + len(bases)] = bases
+        length += len(bases)
+    sequence.resize(length, refcheck=False)
+    return sequence
+
+
+def iter_fasta(source):
+    """
+    Yields (header, sequence) for every record in a FASTA source.
+
+    :param source: A file path, a bytes-like object, or a binary file-like object (e.g. an upload).
+    :return: A generator of (header string, uint8 NumPy array) tuples.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                buffer = np.frombuffer(mapped, dtype=np.uint8)
+                try:
+                    for header, start, end in index_fasta(buffer):
+                        yield header, read_record(buffer, start, end)
+                finally:
+                    # The mmap cannot close while a NumPy view still exports its buffer
+                    del buffer
+    else:
+        buffer = as_buffer(source)
+        for header, start, end in index_fasta(buffer):
+            yield header, read_record(buffer, start, end)
+
+
+def read_fasta(source):
+    """Returns all records of a FASTA source as a list of (header, sequence) tuples."""
+    return list(iter_fasta(source))
+
+
+def read_first_sequence(source):
+    """Returns the sequence of the first record, raising ValueError if the source has no records."""
+    for _, sequence in iter_fasta(source):
+        return sequence
+    raise ValueError("No FASTA records found.")
+
+
+# Compare peak memory with the Biopython/StringIO path
+if __name__ == "__main__":
+    import io
+    import sys
+    import tracemalloc
+
+    from Bio import SeqIO
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/reference-NC_045512.fasta"
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    upload = io.BytesIO(raw)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    legacy = str(SeqIO.read(io.StringIO(upload.getvalue().decode("utf-8")), "fasta").seq)
+    legacy_peak = tracemalloc.get_traced_memory()[1] - baseline
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    sequence = read_first_sequence(upload)
+    new_peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    assert sequence.tobytes().decode("ascii") == legacy
+    print(f"{len(sequence):,} bp | SeqIO peak {legacy_peak / 1e6:.2f} MB | fasta_reader peak {new_peak / 1e6:.2f} MB")
@@ -0,0 +1,89 @@
+'''
+Registry of the NCBI genetic code tables.
+
+Every table is compiled once, at import, into flat 65-entry lookup arrays indexed by 16*a + 4*b + c
+(A=0, C=1, G=2, U=3), with index 64 standing for an unrecognized or incomplete codon. All translation
+paths (protein_synthesis, orf_finder, the simulator) share these arrays, so switching tables is a dict
+lookup and never rebuilds a codon dictionary.
+
+The codon assignments come from Biopython's copy of the NCBI tables. In the few tables where a codon
+is both a stop and a sense codon depending on context (27, 28, 31), it is translated as the amino acid.
+'''
+
+import numpy as np
+from Bio.Data import CodonTable
+
+from residues import one_to_three_letter
+
+RNA_BASES = "ACGU"
+INVALID_CODON = 64
+STANDARD_TABLE_ID = 1
+
+
+def codon_index(codon):
+    """Returns the table index of a three-letter DNA or RNA codon."""
+    a, b, c = (RNA_BASES.index(base) for base in codon.upper().replace("T", "U"))
+    return 16 * a + 4 * b + c
+
+
+class GeneticCode:
+    """One NCBI translation table compiled into lookup arrays."""
+
+    def __init__(self, table_id, name, forward_table, stop_codons, start_codons):
+        self.id = table_id
+        self.name = name
+
+        one_letter = ['X'] * (INVALID_CODON + 1)
+        for codon in stop_codons:
+            one_letter[codon_index(codon)] = '*'
+        for codon, amino_acid in forward_table.items():
+            one_letter[codon_index(codon)] = amino_acid
+
+        # Three-letter names ('Stop' for stop codons, None for an unrecognized codon)
+        self.amino_acids = np.array([one_to_three_letter.get(letter) for letter in one_letter], dtype=object)
+        # One-letter codes as ASCII bytes ('*' for stop, 'X' for an unrecognized codon)
+        self.one_letter = np.frombuffer("".join(one_letter).encode("ascii"), dtype=np.uint8).copy()
+        self.is_stop = self.one_letter == ord('*')
+        self.is_start = np.zeros(INVALID_CODON + 1, dtype=bool)
+        self.is_start[[codon_index(codon) for codon in start_codons]] = True
+        # Translation ends at a stop codon or at an unrecognized codon
+        self.ends_translation = self.is_stop.copy()
+        self.ends_translation[INVALID_CODON] = True
+
+        for array in (self.amino_acids, self.one_letter, self.is_stop, self.is_start, self.ends_translation):
+            array.flags.writeable = False
+
+    @property
+    def start_codons(self):
+        return [codon for codon in _all_codons() if self.is_start[codon_index(codon)]]
+
+    def codon_table(self):
+        """Returns the table as a {codon: three-letter amino acid or 'Stop'} dict."""
+        return {codon: self.amino_acids[codon_index(codon)] for codon in _all_codons()}
+
+    def __repr__(self):
+        return f"GeneticCode({self.id}, {self.name!r})"
+
+
+def _all_codons():
+    return [a + b + c for a in RNA_BASES for b in RNA_BASES for c in RNA_BASES]
+
+
+GENETIC_CODES = {
+    table_id: GeneticCode(table_id, table.names[0], table.forward_table, table.stop_codons, table.start_codons)
+    for table_id, table in sorted(CodonTable.unambiguous_rna_by_id.items())
+}
+
+
+def get_genetic_code(table_id=STANDARD_TABLE_ID):
+    """Returns the compiled GeneticCode for an NCBI table id (an existing GeneticCode is passed through)."""
+    if isinstance(table_id, GeneticCode):
+        return table_id
+    try:
+        return GENETIC_CODES[int(table_id)]
+    except KeyError:
+        raise ValueError(f"Unknown genetic code table: {table_id}. "
+                         f"Available tables: {', '.join(map(str, GENETIC_CODES))}.") from None
+
+
+STANDARD_CODE = get_genetic_code(STANDARD_TABLE_ID)
@@ -0,0 +1,83 @@
+'''
+Content-hash-keyed cache of parsed genomes.
+
+Uploads are identified by a BLAKE2 digest of their raw bytes, so re-scanning the same reference
+against a new variant skips FASTA parsing entirely, no matter how often Streamlit reruns the page.
+Entries are evicted least-recently-used once the total size of the cached sequences exceeds max_bytes.
+'''
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from fasta_reader import as_buffer, read_first_sequence
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_key(data):
+    """Returns a hex digest identifying the contents of a bytes-like object or upload."""
+    return hashlib.blake2b(as_buffer(data), digest_size=20).hexdigest()
+
+
+class GenomeCache:
+    """LRU cache of parsed sequences with byte-size eviction and hit/miss counters."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, loader=read_first_sequence):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data):
+        """Returns the parsed sequence for an upload, parsing it only on a cache miss."""
+        key = content_key(data)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        sequence = self.loader(data)
+        if isinstance(sequence, np.ndarray):
+            sequence.flags.writeable = False  # Shared between sessions, so it must never be modified
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = sequence
+                self.current_bytes += sequence.nbytes
+                self._evict()
+            return self._entries[key]
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the limit
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Returns a dict of counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,393 @@
+'''
+Persistent, memory-mapped genome index.
+
+An index is one binary file written next to a FASTA file (genome.fasta -> genome.fasta.gidx). It holds
+every record concatenated as a 2-bit PackedSequence (packed bases plus the run table of ambiguous bases),
+the record offsets, and the suffix array of the concatenation. Layout: 8-byte magic, little-endian uint64
+length of a JSON header (record names, array sections with offset/dtype/length, source fingerprint), the
+header, then the arrays, each aligned to 64 bytes. Opening an index maps the file and wraps the sections
+with np.frombuffer, so loading costs the same for any genome size and nothing is parsed or copied.
+
+The suffix array is built by prefix doubling: suffixes are first sorted by their first 21 bases (3 bits
+per symbol in one int64), then repeatedly by (rank of i, rank of i + h) with h doubling until all ranks
+differ. Building takes O(n log n) per round and about 40 bytes per base of temporary memory.
+
+A query walks the suffix array one pattern base at a time, narrowing the interval of suffixes that start
+with the bases matched so far with two binary searches on the next base, so a pattern of m bases costs
+O(m log n) single-base lookups in the mapped sequence. IUPAC codes in a motif (R, Y, N, ...) split the
+interval into one sub-interval per allowed base. Matches spanning two records are dropped, and ambiguous
+bases in the genome never match.
+
+    python genome_index.py build genome.fasta
+    python genome_index.py find genome.fasta GTRAG
+'''
+
+import argparse
+import bisect
+import json
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from fasta_reader import iter_fasta
+from genome_cache import content_key
+from packed_sequence import AMBIGUOUS, PackedSequence
+
+MAGIC = b"C2CGIDX\x00"
+FORMAT_VERSION = 1
+INDEX_SUFFIX = ".gidx"
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "code_to_codons", "genome_index")
+DEFAULT_MAX_INDEX_BYTES = 2 * 1024 ** 3  # Upload indexes kept in DEFAULT_INDEX_DIR before the oldest are evicted
+
+_ALIGNMENT = 64
+_PREFIX_LENGTH = 21  # Symbols (3 bits each) sorted in the first suffix array round
+
+# IUPAC code -> 2-bit codes of the bases it stands for
+MOTIF_CODES = {
+    "A": (0,), "C": (1,), "G": (2,), "T": (3,), "U": (3,),
+    "R": (0, 2), "Y": (1, 3), "S": (1, 2), "W": (0, 3), "K": (2, 3), "M": (0, 1),
+    "B": (1, 2, 3), "D": (0, 2, 3), "H": (0, 1, 3), "V": (0, 1, 2), "N": (0, 1, 2, 3),
+}
+
+
+def _dense_ranks(keys, order):
+    # Rank of every key among the distinct keys, given the order that sorts them
+    sorted_keys = keys[order]
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.concatenate(([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1])))
+    return ranks
+
+
+def suffix_array(codes):
+    """
+    Returns the suffix array of a code array (2-bit codes, AMBIGUOUS sorting after T, the end of the
+    sequence before everything), built by prefix doubling.
+    """
+    n = len(codes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    symbols = np.zeros(n + _PREFIX_LENGTH, dtype=np.int64)
+    symbols[:n] = codes
+    symbols[:n] += 1
+    keys = np.zeros(n, dtype=np.int64)
+    for offset in range(_PREFIX_LENGTH):
+        keys <<= 3
+        keys |= symbols[offset:offset + n]
+    del symbols
+
+    order = np.argsort(keys, kind="stable")
+    ranks = _dense_ranks(keys, order)
+    shift = _PREFIX_LENGTH
+    while ranks[order[-1]] < n - 1:
+        # Suffixes tied on their first `shift` symbols are ordered by the rank of the suffix `shift` further on
+        keys = ranks * (n + 1)
+        keys[:n - shift] += ranks[shift:] + 1
+        order = np.argsort(keys, kind="stable")
+        ranks = _dense_ranks(keys, order)
+        shift *= 2
+    return order
+
+
+def _write_index(path, header, sections):
+    # Writes to a unique temporary file first so a reader never maps a half-written index, and concurrent
+    # writers of the same index (threads of one server process) never share a temporary file
+    layout, offset = {}, 0
+    for name, array in sections.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "length": len(array)}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps(dict(header, sections=layout)).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    descriptor, temporary = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in sections.items():
+                handle.seek(data_start + layout[name]["offset"])
+                handle.write(np.ascontiguousarray(array).tobytes())
+            handle.truncate(data_start + offset)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def _fingerprint(path):
+    status = os.stat(path)
+    return {"size": status.st_size, "mtime_ns": status.st_mtime_ns}
+
+
+def build_index(source, index_path, fingerprint=None):
+    """
+    Parses a FASTA source once and writes its index.
+
+    :param source: A file path, bytes-like object or binary file-like object (e.g. an upload).
+    :param index_path: Where to write the index.
+    :param fingerprint: Identifies the source in the header; defaults to the size and mtime of a path source.
+    :return: The opened GenomeIndex.
+    """
+    names, sequences = [], []
+    for header, sequence in iter_fasta(source):
+        names.append(header)
+        sequences.append(sequence)
+    if not sequences:
+        raise ValueError("No FASTA records found.")
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    sequence = PackedSequence.from_sequence(np.concatenate(sequences))
+    del sequences
+
+    positions = suffix_array(sequence.codes())
+    if len(sequence) < 2 ** 31:
+        positions = positions.astype(np.int32)
+    packed, run_starts, run_ends, run_bytes = sequence.buffers
+    if fingerprint is None and isinstance(source, (str, os.PathLike)):
+        fingerprint = _fingerprint(source)
+
+    _write_index(index_path, {
+        "version": FORMAT_VERSION,
+        "names": names,
+        "length": len(sequence),
+        "rna": sequence.is_rna,
+        "source": fingerprint,
+    }, {
+        "packed": packed, "run_starts": run_starts, "run_ends": run_ends, "run_bytes": run_bytes,
+        "offsets": offsets, "suffix_array": positions,
+    })
+    return GenomeIndex(index_path)
+
+
+class GenomeIndex:
+    """A memory-mapped genome index (see the module docstring); build one with build_index or load_index."""
+
+    def __init__(self, path):
+        self.path = path
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        if mapped[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a genome index")
+        (header_length,) = struct.unpack("<Q", mapped[len(MAGIC):len(MAGIC) + 8].tobytes())
+        header_end = len(MAGIC) + 8 + header_length
+        self.header = json.loads(mapped[len(MAGIC) + 8:header_end].tobytes())
+        if self.header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has index format {self.header['version']}, expected {FORMAT_VERSION}")
+
+        data_start = -(-header_end // _ALIGNMENT) * _ALIGNMENT
+        arrays = {name: np.frombuffer(mapped, dtype=section["dtype"], count=section["length"],
+                                      offset=data_start + section["offset"])
+                  for name, section in self.header["sections"].items()}
+        self.names = self.header["names"]
+        self.offsets = arrays["offsets"]
+        self.suffix_array = arrays["suffix_array"]
+        self.sequence = PackedSequence(arrays["packed"], arrays["run_starts"], arrays["run_ends"],
+                                       arrays["run_bytes"], 0, self.header["length"], self.header["rna"])
+        # Single-base lookups index memoryviews, which return plain ints much faster than NumPy scalars
+        self._packed = memoryview(arrays["packed"])
+        self._run_starts = memoryview(arrays["run_starts"])
+        self._run_ends = memoryview(arrays["run_ends"])
+        self._suffixes = memoryview(self.suffix_array)
+
+    def __len__(self):
+        """Total number of bases over all records."""
+        return len(self.sequence)
+
+    def record(self, item):
+        """Returns one record (by index or name) as a PackedSequence view into the mapped index."""
+        index = self.names.index(item) if isinstance(item, str) else item
+        return self.sequence[int(self.offsets[index]):int(self.offsets[index + 1])]
+
+    def _code_at(self, position):
+        # Code of one base of the concatenation: AMBIGUOUS in a run, -1 past the end (sorts first, as when built)
+        if position >= len(self.sequence):
+            return -1
+        if self._run_starts:
+            run = bisect.bisect_right(self._run_ends, position)
+            if run < len(self._run_starts) and self._run_starts[run] <= position:
+                return AMBIGUOUS
+        return (self._packed[position >> 2] >> (6 - 2 * (position & 3))) & 3
+
+    def _narrow(self, low, high, depth, code):
+        # Suffixes in [low, high) share their first `depth` bases, so they are sorted by base `depth`:
+        # two binary searches find the ones where it equals `code`
+        bounds = []
+        for strict in (False, True):
+            lo, hi = low, high
+            while lo < hi:
+                middle = (lo + hi) // 2
+                found = self._code_at(self._suffixes[middle] + depth)
+                if found < code or (strict and found == code):
+                    lo = middle + 1
+                else:
+                    hi = middle
+            bounds.append(lo)
+            low = lo
+        return bounds
+
+    def find(self, motif):
+        """
+        Finds every occurrence of a motif (A/C/G/T/U and IUPAC codes, any case) on the forward strand.
+
+        :return: (records, positions) int64 arrays sorted by record then position; positions are 0-based
+                 within the record.
+        """
+        try:
+            allowed = [MOTIF_CODES[base] for base in motif.upper()]
+        except KeyError as error:
+            raise ValueError(f"Unsupported base {error.args[0]!r} in motif {motif!r}") from None
+        if not allowed:
+            raise ValueError("The motif is empty.")
+
+        intervals = [(0, len(self.suffix_array))]
+        for depth, codes in enumerate(allowed):
+            intervals = [(low, high) for start, end in intervals for code in codes
+                         for low, high in [self._narrow(start, end, depth, code)] if low < high]
+            if not intervals:
+                break
+        hits = np.sort(np.concatenate([self.suffix_array[low:high] for low, high in intervals]).astype(np.int64)
+                       if intervals else np.empty(0, dtype=np.int64))
+
+        records = np.searchsorted(self.offsets, hits, side="right") - 1
+        within = hits + len(allowed) <= self.offsets[records + 1]
+        records, hits = records[within], hits[within]
+        return records, hits - self.offsets[records]
+
+    def count(self, motif):
+        """Number of occurrences of a motif (see find)."""
+        return len(self.find(motif)[1])
+
+
+def load_index(fasta_path, index_path=None, rebuild=False):
+    """
+    Opens the index next to a FASTA file (fasta_path + INDEX_SUFFIX by default), building it first if it is
+    missing, was built from a different version of the file, or rebuild is True.
+    """
+    index_path = index_path or fasta_path + INDEX_SUFFIX
+    if not rebuild and os.path.exists(index_path):
+        try:
+            index = GenomeIndex(index_path)
+            if index.header["source"] == _fingerprint(fasta_path):
+                return index
+        except (ValueError, KeyError):
+            pass  # Unreadable or outdated format: rebuild it
+    return build_index(fasta_path, index_path)
+
+
+def _evict_indexes(directory, max_bytes, keep):
+    # Removes the least recently used indexes (modification time, refreshed on every use) until the directory
+    # fits in max_bytes. Sessions that already mapped an evicted index keep their mapping.
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(INDEX_SUFFIX):
+            path = os.path.join(directory, name)
+            try:
+                status = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((status.st_mtime_ns, status.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:  # Removed by another session, or still mapped on a platform that forbids it
+            continue
+        total -= size
+
+
+def index_upload(data, directory=DEFAULT_INDEX_DIR, max_bytes=DEFAULT_MAX_INDEX_BYTES):
+    """
+    Returns the index of uploaded FASTA contents, stored in directory under their content hash, so an upload
+    is only parsed the first time it is ever indexed (across sessions and server restarts). Once the
+    directory holds more than max_bytes of indexes, the least recently used ones are removed.
+    """
+    key = content_key(data)
+    path = os.path.join(directory, key + INDEX_SUFFIX)
+    if os.path.exists(path):
+        try:
+            index = GenomeIndex(path)
+            os.utime(path)  # Marks the index as recently used
+            return index
+        except (OSError, ValueError, KeyError):
+            pass
+    os.makedirs(directory, exist_ok=True)
+    index = build_index(data, path, fingerprint={"content": key})
+    _evict_indexes(directory, max_bytes, keep=path)
+    return index
+
+
+def _find_regex(sequence, motif):
+    # Re-parse-free regex scan with a lookahead for overlapping matches, kept for benchmarking.
+    import re
+
+    classes = {base: "[" + "".join("ACGT"[code] for code in codes) + "]" for base, codes in MOTIF_CODES.items()}
+    pattern = re.compile("(?=" + "".join(classes[base] for base in motif.upper()) + ")")
+    return [match.start() for match in pattern.finditer(sequence.upper().replace("U", "T"))]
+
+
+def _benchmark():
+    import tempfile
+    import timeit
+
+    from fasta_reader import read_first_sequence
+
+    motifs = ("GTAAGT", "GTRAG", "TTTCGAAC", "AGGAGG", "GT")
+    with tempfile.TemporaryDirectory() as directory:
+        # The bundled genomes plus a random 4 Mbp one (bacterial size)
+        synthetic = os.path.join(directory, "random-4Mbp.fasta")
+        bases = np.frombuffer(b"ACGT", dtype=np.uint8)[np.random.default_rng(0).integers(0, 4, size=4_000_000)]
+        with open(synthetic, "wb") as handle:
+            handle.write(b">random\n" + b"\n".join(bases[i:i + 60].tobytes() for i in range(0, len(bases), 60)))
+        for fasta in ("data/reference-NC_045512.fasta", "data/BA.3.1.fasta", synthetic):
+            name = os.path.basename(fasta)
+            index_path = os.path.join(directory, name + INDEX_SUFFIX)
+            build = timeit.timeit(lambda: build_index(fasta, index_path), number=1)
+            runs = 20
+            load = timeit.timeit(lambda: GenomeIndex(index_path), number=runs) / runs
+            parse = timeit.timeit(lambda: read_first_sequence(fasta), number=runs) / runs
+            index = GenomeIndex(index_path)
+            text = read_first_sequence(fasta).tobytes().decode("ascii")
+            print(f"{name}: {len(index):,} bp | build {build * 1000:.1f} ms, index {os.path.getsize(index_path):,} "
+                  f"bytes | load {load * 1000:.3f} ms vs FASTA parse {parse * 1000:.3f} ms")
+            for motif in motifs:
+                assert index.find(motif)[1].tolist() == _find_regex(text, motif)
+                query = timeit.timeit(lambda: index.find(motif), number=runs) / runs
+                regex = timeit.timeit(lambda: _find_regex(text, motif), number=runs) / runs
+                print(f"  {motif:>9}: {index.count(motif):>5,} hits | index {query * 1000:7.3f} ms | "
+                      f"parse + regex {(parse + regex) * 1000:7.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query memory-mapped genome indexes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Write the index of a FASTA file")
+    build.add_argument("fasta")
+    build.add_argument("-o", "--output", help=f"Index path (default: FASTA path + {INDEX_SUFFIX})")
+    find = commands.add_parser("find", help="Print the occurrences of a motif (building the index if needed)")
+    find.add_argument("fasta")
+    find.add_argument("motif", help="Bases and IUPAC codes, e.g. GTRAG")
+    find.add_argument("--limit", type=int, default=20, help="Occurrences to print (0 for all)")
+    commands.add_parser("benchmark", help="Compare index queries with parsing and regex scanning")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = build_index(args.fasta, args.output or args.fasta + INDEX_SUFFIX)
+        print(f"Indexed {len(index.names)} record(s), {len(index):,} bases -> {index.path}")
+    elif args.command == "find":
+        index = load_index(args.fasta)
+        records, positions = index.find(args.motif)
+        print(f"{len(positions):,} occurrence(s) of {args.motif}")
+        shown = len(positions) if args.limit == 0 else args.limit
+        for record, position in zip(records[:shown].tolist(), positions[:shown].tolist()):
+            print(f"{index.names[record].split()[0]}\t{position}")
+    else:
+        _benchmark()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+'''
+Cold import time of the app's page modules and their heavy dependencies.
+
+Each module is imported in a fresh interpreter, so nothing is shared through sys.modules, and the best
+of several runs is reported. Only the import itself is timed, not the interpreter start-up.
+
+    python import_benchmark.py [module ...]
+'''
+
+import subprocess
+import sys
+
+PAGE_MODULES = ["home", "basewarp", "stability_matrix", "mutation_explorer", "biosynthesis_simulator"]
+DEPENDENCIES = ["streamlit", "numpy", "matplotlib.pyplot", "requests", "rdkit.Chem.Draw", "Bio.Data.CodonTable",
+                "llm_client", "draw_molecules"]
+
+_TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def import_time(module, runs=3):
+    """Returns the best cold import time of a module in seconds, or None if it cannot be imported."""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", _TIMER.format(module=module)], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        elapsed = float(result.stdout.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or PAGE_MODULES + DEPENDENCIES
+    width = max(len(module) for module in modules)
+    for module in modules:
+        elapsed = import_time(module)
+        report = "not importable here" if elapsed is None else f"{elapsed * 1000:8.1f} ms"
+        print(f"{module:>{width}} {report}")
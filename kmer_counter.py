@@ -0,0 +1,194 @@
+'''
+k-mer counting on 2-bit encoded sequences.
+
+A k-mer (k <= 31) is packed into a uint64, two bits per base with the first base in the high bits, so
+numeric order is lexicographic order. The values of all windows are built the way a rolling update
+((value << 2) | code) would build them, but vectorized by doubling: the values of 2L-mers are
+(L-mer at i << 2L) | L-mer at i + L, and k is assembled from its binary digits, so the cost is
+O(n log k) array operations rather than k full-length shifts. The reverse complement of every window is
+built the same way (complemented codes, first base in the low bits), and the canonical k-mer is the smaller
+of the two. Windows that contain an ambiguous base (anything but A/C/G/T/U) are skipped.
+
+Counts are returned as sorted unique k-mers plus counts, ready for np.intersect1d, np.searchsorted or
+merging. For large inputs the sequence is processed in chunks and the k-mer space is split into value
+ranges, each counted in its own pass over the sequence: peak memory is about 8 bytes per k-mer occurrence
+divided by the number of partitions, and concatenating the partitions keeps the result sorted.
+'''
+
+import numpy as np
+
+from composition import encode
+from packed_sequence import AMBIGUOUS
+
+MAX_K = 31
+DEFAULT_K = 21
+
+# Bases encoded per chunk, which bounds the temporaries of building the k-mer values
+CHUNK_SIZE = 1 << 22
+
+_LETTERS = "ACGT"
+
+
+def encode_kmer(kmer):
+    """Packs a k-mer string (A/C/G/T/U, any case) into its integer value."""
+    value = 0
+    for base in kmer.upper().replace("U", "T"):
+        value = (value << 2) | _LETTERS.index(base)
+    return value
+
+
+def decode_kmer(value, k):
+    """Returns the k-mer string of an integer value."""
+    value = int(value)
+    return "".join(_LETTERS[(value >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def _window_values(packed, k, reverse=False):
+    # Values of all len(packed) - k + 1 windows, forward (first base high) or reversed (first base low)
+    n = len(packed) - k + 1
+    block, length = packed, 1  # block[i] holds the length-mer starting at i
+    values, filled = None, 0
+    remaining = k
+    while remaining:
+        if remaining & 1:
+            part = block[filled:filled + n]
+            if values is None:
+                values = part.copy()
+            elif reverse:
+                values |= part << np.uint64(2 * filled)
+            else:
+                values <<= np.uint64(2 * length)
+                values |= part
+            filled += length
+        remaining >>= 1
+        if remaining:
+            if reverse:
+                block = block[:-length] | (block[length:] << np.uint64(2 * length))
+            else:
+                block = (block[:-length] << np.uint64(2 * length)) | block[length:]
+            length *= 2
+    return values
+
+
+def kmer_values(codes, k=DEFAULT_K, canonical=False):
+    """
+    Packs every k-mer of a code array into a uint64.
+
+    :param codes: 2-bit base codes with AMBIGUOUS for anything else (see composition.encode).
+    :param k: k-mer length, 1 to MAX_K.
+    :param canonical: If True, each k-mer is the smaller of itself and its reverse complement.
+    :return: (values, start positions) for the windows without ambiguous bases.
+    """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    ambiguous = codes == AMBIGUOUS
+    packed = np.where(ambiguous, 0, codes).astype(np.uint64)
+    values = _window_values(packed, k)
+    if canonical:
+        np.minimum(values, _window_values(np.uint64(3) - packed, k, reverse=True), out=values)
+    if not ambiguous.any():
+        return values, np.arange(n)
+    invalid = np.concatenate(([0], np.cumsum(ambiguous)))
+    positions = np.flatnonzero(invalid[k:] == invalid[:-k])
+    return values[positions], positions
+
+
+def _chunk_values(sequence, k, canonical, chunk_size):
+    # k-mer values chunk by chunk; consecutive chunks overlap by k - 1 bases so no window is lost or repeated
+    for start in range(0, max(len(sequence) - k + 1, 0), chunk_size):
+        yield kmer_values(encode(sequence[start:start + chunk_size + k - 1]), k, canonical)[0]
+
+
+def count_kmers(sequence, k=DEFAULT_K, canonical=False, partitions=1, chunk_size=CHUNK_SIZE):
+    """
+    Counts the k-mers of a sequence.
+
+    :param sequence: str, bytes-like or PackedSequence.
+    :param k: k-mer length, 1 to MAX_K.
+    :param canonical: Count a k-mer and its reverse complement together (under the smaller value).
+    :param partitions: Number of k-mer value ranges counted in separate passes; raise it to bound memory
+                       on large inputs (about 8 bytes per k-mer occurrence / partitions).
+    :param chunk_size: Bases encoded at a time.
+    :return: (kmers, counts): sorted unique uint64 k-mer values and their int64 counts.
+    """
+    if partitions == 1:
+        chunks = list(_chunk_values(sequence, k, canonical, chunk_size))
+        values = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint64)
+        kmers, counts = np.unique(values, return_counts=True)
+        return kmers, counts.astype(np.int64)
+
+    bounds = [(4 ** k * p) // partitions for p in range(partitions + 1)]
+    kmers, counts = [], []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        low, high = np.uint64(low), np.uint64(high)
+        selected = [values[(values >= low) & (values < high)]
+                    for values in _chunk_values(sequence, k, canonical, chunk_size)]
+        partition_kmers, partition_counts = np.unique(np.concatenate(selected) if selected else
+                                                      np.empty(0, dtype=np.uint64), return_counts=True)
+        kmers.append(partition_kmers)
+        counts.append(partition_counts.astype(np.int64))
+    return np.concatenate(kmers), np.concatenate(counts)
+
+
+def kmer_spectrum(counts):
+    """Returns the k-mer spectrum: element m is the number of distinct k-mers seen exactly m times."""
+    return np.bincount(counts)
+
+
+def shared_kmers(kmers_a, counts_a, kmers_b, counts_b):
+    """Returns (kmers, counts in a, counts in b) for the k-mers present in both of two count_kmers results."""
+    shared, index_a, index_b = np.intersect1d(kmers_a, kmers_b, assume_unique=True, return_indices=True)
+    return shared, counts_a[index_a], counts_b[index_b]
+
+
+def _count_kmers_dict(sequence, k=DEFAULT_K):
+    # Slice-and-dict counting, kept for benchmarking.
+    from collections import Counter
+
+    sequence = sequence.upper()
+    counts = Counter(sequence[i:i + k] for i in range(len(sequence) - k + 1))
+    return {kmer: count for kmer, count in counts.items() if set(kmer) <= set(_LETTERS)}
+
+
+def _kmer_values_shifts(codes, k):
+    # One full-length shift per base (the former variant_caller seeding), kept for benchmarking.
+    n = len(codes) - k + 1
+    values = np.zeros(n, dtype=np.uint64)
+    packed = np.where(codes == AMBIGUOUS, 0, codes).astype(np.uint64)
+    for offset in range(k):
+        values = (values << np.uint64(2)) | packed[offset:offset + n]
+    return values
+
+
+# Benchmark on the bundled genomes
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+
+    genomes = {name: read_first_sequence(f"data/{name}.fasta").tobytes().decode("ascii")
+               for name in ("reference-NC_045512", "BA.3.1")}
+    runs = 5
+    for name, genome in genomes.items():
+        codes = encode(genome)
+        for k in (11, 21, 31):
+            kmers, counts = count_kmers(genome, k)
+            reference = _count_kmers_dict(genome, k)
+            assert dict(zip((decode_kmer(value, k) for value in kmers), counts.tolist())) == reference
+            assert np.array_equal(count_kmers(genome, k, partitions=4, chunk_size=1000)[0], kmers)
+            canonical = count_kmers(genome, k, canonical=True)[0]
+
+            dictionary = timeit.timeit(lambda: _count_kmers_dict(genome, k), number=runs) / runs
+            counting = timeit.timeit(lambda: count_kmers(genome, k), number=runs) / runs
+            doubling = timeit.timeit(lambda: kmer_values(codes, k), number=runs) / runs
+            shifts = timeit.timeit(lambda: _kmer_values_shifts(codes, k), number=runs) / runs
+            print(f"{name:>20} {len(genome):,} bp k={k:<2} | {len(kmers):,} distinct ({len(canonical):,} canonical), "
+                  f"{int(kmer_spectrum(counts)[1]):,} unique | dict {dictionary * 1000:6.1f} ms, count_kmers "
+                  f"{counting * 1000:5.2f} ms | values: doubling {doubling * 1000:5.2f} ms, shifts {shifts * 1000:5.2f} ms")
+
+    k = DEFAULT_K
+    shared, _, _ = shared_kmers(*count_kmers(genomes["reference-NC_045512"], k), *count_kmers(genomes["BA.3.1"], k))
+    print(f"Shared {k}-mers between the genomes: {len(shared):,}")
@@ -0,0 +1,257 @@
+'''
+Asynchronous, cached client for the LLM explanations.
+
+All prompts of a page are sent concurrently from a thread pool that shares one pooled requests.Session,
+so a page waits for roughly one round-trip instead of one per prompt. Rate-limit and loading responses
+(429/503) are retried with asyncio.sleep, which never blocks the other requests, and connection errors
+after a short backoff. Every wait (Retry-After included) is capped at max_wait and all waits of a prompt
+at retry_budget, so a rate-limited page returns UNAVAILABLE within seconds and the next rerun tries again.
+
+Successful responses are stored in an SQLite file keyed by model (the API URL) and prompt, and are
+reused until they are older than the time-to-live; a cached page needs no request at all.
+
+The endpoint can be pointed at a local stub server with the api_url argument or the LLM_API_URL
+environment variable (see the benchmark at the bottom of this file).
+'''
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://api-inference.huggingface.co/models/tiiuae/falcon-7b-instruct"
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "code_to_codons", "llm_cache.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_RETRY_WAIT = {503: 10.0, 429: 30.0}
+DEFAULT_ERROR_WAIT = 0.5
+DEFAULT_MAX_WAIT = 2.0
+DEFAULT_RETRY_BUDGET = 4.0
+
+UNAVAILABLE = "API is currently unavailable. Please try again later."
+NOT_JSON = "Error: Response was not in JSON format."
+NO_RESPONSE = "No response text."
+
+# Returned by _post in place of the parsed body when a 200 response is not valid JSON
+_INVALID_JSON = object()
+
+
+class ResponseCache:
+    """Persistent prompt -> response cache in an SQLite file, with time-to-live eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt TEXT, response TEXT, created REAL)")
+        self.evict_expired()
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt):
+        """Returns the cached response, or None if it is missing or expired."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (self.key(model, prompt),)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, model, prompt, response):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (self.key(model, prompt), model, prompt, response, time.time()))
+
+    def evict_expired(self):
+        """Deletes expired entries and returns how many were removed."""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+def clean_response(prompt, data):
+    """
+    Extracts the generated text, drops the echoed prompt and strips non-ASCII characters.
+    Bodies that are not a dict or a non-empty list starting with one give NO_RESPONSE.
+    """
+    if isinstance(data, list):
+        data = data[0] if data else None
+    full_response = data.get("generated_text") if isinstance(data, dict) else None
+    if not isinstance(full_response, str):
+        return NO_RESPONSE
+    return re.sub(r'[^\x00-\x7F]+', '', full_response.replace(prompt, "").strip())
+
+
+class ExplanationClient:
+    """
+    Fetches explanations for many prompts concurrently.
+
+    :param api_url: Inference endpoint; defaults to $LLM_API_URL, then DEFAULT_API_URL.
+    :param token: Bearer token; defaults to $HUGGINGFACE_TOKEN. Requests are sent without one if unset.
+    :param cache: A ResponseCache, None for the default on-disk cache, or False to disable caching.
+    :param retries: Attempts per prompt.
+    :param retry_wait: Seconds to wait per retryable status code (a Retry-After header takes precedence).
+    :param error_wait: Seconds to wait after a connection error, doubled on each further attempt.
+    :param max_wait: Upper bound of a single wait.
+    :param retry_budget: Upper bound of all waits for one prompt; past it the prompt gives UNAVAILABLE.
+    :param max_concurrency: Requests in flight at once (also the connection pool size).
+    :param timeout: Per-request timeout in seconds.
+    """
+
+    def __init__(self, api_url=None, token=None, cache=None, retries=3, retry_wait=None,
+                 error_wait=DEFAULT_ERROR_WAIT, max_wait=DEFAULT_MAX_WAIT, retry_budget=DEFAULT_RETRY_BUDGET,
+                 max_concurrency=8, timeout=60):
+        self.api_url = api_url or os.getenv("LLM_API_URL") or DEFAULT_API_URL
+        self.token = token if token is not None else os.getenv("HUGGINGFACE_TOKEN")
+        self.cache = ResponseCache() if cache is None else (None if cache is False else cache)
+        self.retries = retries
+        self.retry_wait = DEFAULT_RETRY_WAIT if retry_wait is None else retry_wait
+        self.error_wait = error_wait
+        self.max_wait = max_wait
+        self.retry_budget = retry_budget
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=max_concurrency))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_concurrency))
+        if self.token:
+            self.session.headers["Authorization"] = f"Bearer {self.token}"
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+    def _post(self, prompt):
+        # Runs in the thread pool; returns (status, parsed JSON or None, Retry-After seconds or None)
+        try:
+            response = self.session.post(self.api_url, json={"inputs": prompt}, timeout=self.timeout)
+        except requests.RequestException:
+            return None, None, None
+        retry_after = response.headers.get("Retry-After")
+        retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+        if response.status_code != 200:
+            return response.status_code, None, retry_after
+        try:
+            return 200, response.json(), None
+        except ValueError:
+            return 200, _INVALID_JSON, None
+
+    async def explain(self, prompt, retries=None):
+        """Returns the explanation for one prompt, from the cache when possible."""
+        if self.cache is not None:
+            cached = self.cache.get(self.api_url, prompt)
+            if cached is not None:
+                return cached
+
+        loop = asyncio.get_running_loop()
+        attempts = retries or self.retries
+        waited = 0.0
+        for attempt in range(attempts):
+            status, data, retry_after = await loop.run_in_executor(self._executor, self._post, prompt)
+            if status == 200:
+                if data is _INVALID_JSON:
+                    return NOT_JSON
+                explanation = clean_response(prompt, data)
+                # A malformed body is not cached, so the next page load asks again
+                if self.cache is not None and explanation != NO_RESPONSE:
+                    self.cache.put(self.api_url, prompt, explanation)
+                return explanation
+            if status is None:
+                wait = self.error_wait * 2 ** attempt
+            elif status in self.retry_wait:
+                wait = retry_after if retry_after is not None else self.retry_wait[status]
+            else:
+                break  # Other errors (bad token, unknown model, ...) will not go away by retrying
+            wait = min(wait, self.max_wait)
+            if attempt == attempts - 1 or waited + wait > self.retry_budget:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        return UNAVAILABLE
+
+    async def explain_all(self, prompts, retries=None):
+        """Returns the explanations for all prompts, in order; duplicate prompts are requested once."""
+        unique = list(dict.fromkeys(prompts))
+        answers = await asyncio.gather(*(self.explain(prompt, retries) for prompt in unique))
+        lookup = dict(zip(unique, answers))
+        return [lookup[prompt] for prompt in prompts]
+
+    def explain_many(self, prompts, retries=None):
+        """Synchronous wrapper around explain_all for callers without an event loop (e.g. Streamlit scripts)."""
+        return asyncio.run(self.explain_all(prompts, retries))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+# Benchmark against a local stub server with a fixed latency
+if __name__ == "__main__":
+    import json
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    LATENCY = 0.3
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["inputs"]
+            time.sleep(LATENCY)
+            body = json.dumps([{"generated_text": f"{prompt} Stub answer."}]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    prompts = [f"Explain topic {i}." for i in range(5)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for prompt in prompts:
+            requests.post(url, json={"inputs": prompt})
+        sequential = time.perf_counter() - start
+
+        client = ExplanationClient(api_url=url, cache=ResponseCache(os.path.join(directory, "cache.sqlite3")))
+        start = time.perf_counter()
+        answers = client.explain_many(prompts)
+        concurrent = time.perf_counter() - start
+        start = time.perf_counter()
+        assert client.explain_many(prompts) == answers == ["Stub answer."] * len(prompts)
+        cached = time.perf_counter() - start
+        client.close()
+    server.shutdown()
+
+    print(f"{len(prompts)} prompts @ {LATENCY * 1000:.0f} ms | sequential {sequential * 1000:.0f} ms | "
+          f"concurrent {concurrent * 1000:.0f} ms | cached {cached * 1000:.1f} ms")
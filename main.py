@@ -1,20 +1,24 @@
+import importlib
+
 import streamlit as st
-import home  # Import home page
-import mutation_explorer  
-import biosynthesis_simulator 
-import basewarp
-import stability_matrix
 
+# Page name -> module; a page is imported on first navigation, so its dependencies (RDKit, requests,
+# matplotlib, ...) are only loaded when someone opens it
 PAGES = {
-    "Home": home,  # Home page
-    "BaseWarp Game": basewarp,
-    "Bio-Synthesis Simulator": biosynthesis_simulator,
-    "Mutation Explorer": mutation_explorer,
-    "Stability Matrix": stability_matrix,
+    "Home": "home",  # Home page
+    "BaseWarp Game": "basewarp",
+    "Bio-Synthesis Simulator": "biosynthesis_simulator",
+    "Mutation Explorer": "mutation_explorer",
+    "Stability Matrix": "stability_matrix",
 }
 
+
+def load_page(name):
+    return importlib.import_module(PAGES[name])  # Cached in sys.modules after the first import
+
+
 st.sidebar.title("Navigation")
 selection = st.sidebar.radio("Go to", list(PAGES.keys()), index=0)  # Default to Home
 
-page = PAGES[selection]
+page = load_page(selection)
 page.app()
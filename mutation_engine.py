@@ -0,0 +1,134 @@
+'''
+Vectorized mutation simulator.
+
+Instead of drawing one random number per base, the number of mutations is drawn once from a binomial
+distribution and the mutated sites are then chosen in bulk with a seeded numpy.random.Generator.
+
+Substitutions work on 2-bit base codes (A=0, C=1, G=2, T=3), where every substitution is an XOR:
+    code ^ 2 is the transition partner (A<->G, C<->T), code ^ 1 and code ^ 3 are the two transversions.
+
+Substitution models:
+    "uniform": each of the three other bases is equally likely (the original mutate_dna behaviour).
+    "kimura":  Kimura 2-parameter (K80); transitions are kappa times as likely as each transversion.
+
+Insertions add one random base before a site and deletions remove a site. The mutation log is returned
+as arrays in the coordinates of the input sequence.
+'''
+
+import numpy as np
+
+from packed_sequence import PackedSequence
+
+SUBSTITUTION = 0
+INSERTION = 1
+DELETION = 2
+
+BASES = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+# ASCII byte -> base code; 4 marks anything that cannot be substituted (N, gaps, ...)
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _bases in enumerate(("Aa", "Cc", "Gg", "Tt")):
+    for _base in _bases:
+        BASE_CODES[ord(_base)] = _code
+
+_TRANSITION = 2
+_TRANSVERSIONS = np.array([1, 3], dtype=np.uint8)
+_UNIFORM = np.array([1, 2, 3], dtype=np.uint8)
+
+
+def _substitution_masks(model, count, rng, kappa):
+    # XOR masks applied to the base codes of the substituted sites
+    if model == "uniform":
+        return _UNIFORM[rng.integers(0, 3, size=count)]
+    if model == "kimura":
+        masks = _TRANSVERSIONS[rng.integers(0, 2, size=count)]
+        masks[rng.random(count) < kappa / (kappa + 2.0)] = _TRANSITION
+        return masks
+    raise ValueError(f"Unknown substitution model: {model!r}. Use 'uniform' or 'kimura'.")
+
+
+def simulate_mutations(dna_sequence, substitution_rate, model="uniform", kappa=2.0,
+                       insertion_rate=0.0, deletion_rate=0.0, rng=None):
+    """
+    Mutates a DNA sequence.
+
+    :param dna_sequence: DNA as str, bytes-like or PackedSequence.
+    :param substitution_rate: Per-base substitution probability.
+    :param model: "uniform" or "kimura".
+    :param kappa: Transition/transversion rate ratio for the Kimura model.
+    :param insertion_rate: Per-base probability of inserting one random base before the site.
+    :param deletion_rate: Per-base probability of deleting the site.
+    :param rng: numpy.random.Generator or seed.
+    :return: A tuple (mutated sequence as str, log). The log is a dict of arrays sorted by position:
+             position (in the input), kind (SUBSTITUTION/INSERTION/DELETION), ref and alt (ASCII bytes;
+             ref is 0 for insertions and alt is 0 for deletions).
+    """
+    if not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+    if isinstance(dna_sequence, PackedSequence):
+        dna_sequence = dna_sequence.to_bytes()
+    elif isinstance(dna_sequence, str):
+        dna_sequence = dna_sequence.encode("ascii")
+    sequence = np.frombuffer(dna_sequence, dtype=np.uint8).copy()
+    length = len(sequence)
+
+    rates = [substitution_rate, insertion_rate, deletion_rate]
+    counts = np.array([rng.binomial(length, rate) if length and rate > 0 else 0 for rate in rates])
+    # Sites are distinct, so no base is both substituted and deleted
+    counts = np.diff(np.minimum(np.concatenate(([0], np.cumsum(counts))), length))
+    sites = np.sort(rng.choice(length, size=counts.sum(), replace=False))
+    kinds = rng.permutation(np.repeat(np.array([SUBSTITUTION, INSERTION, DELETION], dtype=np.uint8), counts))
+
+    # Substitutions at sites holding a non-ACGT byte are dropped
+    untouchable = (kinds == SUBSTITUTION) & (BASE_CODES[sequence[sites]] == 4)
+    sites, kinds = sites[~untouchable], kinds[~untouchable]
+    is_substitution, is_insertion, is_deletion = (kinds == kind for kind in (SUBSTITUTION, INSERTION, DELETION))
+
+    ref = np.where(is_insertion, 0, sequence[sites]).astype(np.uint8)
+    alt = np.zeros(len(sites), dtype=np.uint8)
+    codes = BASE_CODES[ref[is_substitution]] ^ _substitution_masks(model, int(is_substitution.sum()), rng, kappa)
+    alt[is_substitution] = BASES[codes]
+    alt[is_insertion] = BASES[rng.integers(0, 4, size=int(is_insertion.sum()))]
+    sequence[sites[is_substitution]] = alt[is_substitution]
+
+    if is_insertion.any() or is_deletion.any():
+        keep = np.ones(length, dtype=bool)
+        keep[sites[is_deletion]] = False
+        sequence = np.insert(sequence, sites[is_insertion], alt[is_insertion])
+        keep = np.insert(keep, sites[is_insertion], True)
+        sequence = sequence[keep]
+
+    log = {"position": sites, "kind": kinds, "ref": ref, "alt": alt}
+    return sequence.tobytes().decode("ascii"), log
+
+
+def _mutate_dna_loop(dna_sequence, mutation_rate):
+    # The original per-base implementation from biosynthesis_simulator, kept for benchmarking.
+    import random
+    dna_list = list(dna_sequence)
+    mutations_occurred = False
+    for i in range(len(dna_list)):
+        if random.random() < mutation_rate:
+            mutations = {'A': 'CGT', 'C': 'AGT', 'G': 'ACT', 'T': 'ACG'}
+            dna_list[i] = random.choice(mutations[dna_list[i]])
+            mutations_occurred = True
+    return ''.join(dna_list), mutations_occurred
+
+
+# Benchmark against the per-base loop
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+
+    genome = read_first_sequence("data/reference-NC_045512.fasta").tobytes().decode("ascii")
+    for copies in (1, 100):
+        sequence = genome * copies
+        for rate in (0.01, 0.3):
+            loop = timeit.timeit(lambda: _mutate_dna_loop(sequence, rate), number=1)
+            vectorized = timeit.timeit(lambda: simulate_mutations(sequence, rate, rng=0), number=3) / 3
+            kimura = timeit.timeit(lambda: simulate_mutations(sequence, rate, model="kimura", kappa=4.0,
+                                                              insertion_rate=rate / 10, deletion_rate=rate / 10,
+                                                              rng=0), number=3) / 3
+            print(f"{len(sequence):>10,} bp @ {rate:4.0%} | loop {loop * 1000:9.1f} ms | uniform "
+                  f"{vectorized * 1000:7.2f} ms | kimura+indels {kimura * 1000:7.2f} ms")
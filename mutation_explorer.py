@@ -1,7 +1,22 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-from Bio import SeqIO
-import io
+import numpy as np
+from genome_cache import GenomeCache
+from genome_index import index_upload
+from packed_sequence import read_packed_sequence
+from snp_finder import find_snps
+from variant_caller import call_variants
+from snp_classifier import BASES, count_ts_tv, substitution_matrix, ts_tv_ratio
+from protein_properties import PROFILES, orf_profiles
+
+# ORFs drawn in the property heatmap (the longest ones); bacterial genomes have thousands of ORFs >= 100 aa
+MAX_PROFILED_ORFS = 40
+
+
+@st.cache_resource
+def get_genome_cache():
+    # One cache per server process, shared by every session and rerun; 2-bit packing fits 4x more genomes
+    return GenomeCache(loader=read_packed_sequence)
 
 
 def app():
@@ -140,10 +155,15 @@ def app():
     st.sidebar.header("Upload Your FASTA Files")
     ref_file = st.sidebar.file_uploader("Reference Genome (FASTA)", type=["fasta"])
     var_file = st.sidebar.file_uploader("Variant Genome (FASTA)", type=["fasta"])
+    align_genomes = st.sidebar.checkbox("Align genomes (detect insertions and deletions)", value=True)
+    orf_profile = st.sidebar.selectbox("ORF property profile", list(PROFILES))
+    motif = st.sidebar.text_input("Reference motif search (IUPAC, e.g. GTRAG)").strip()
 
     # Helper
+    genome_cache = get_genome_cache()
+
     def load_fasta(file):
-        return str(SeqIO.read(io.StringIO(file.getvalue().decode("utf-8")), "fasta").seq)
+        return genome_cache.get(file)
 
     if ref_file and var_file:
         st.sidebar.success("Files Uploaded Successfully")
@@ -158,17 +178,39 @@ def app():
             col1.metric("Reference Genome Length", f"{len(reference_seq)} bp")
             col2.metric("Variant Genome Length", f"{len(variant_seq)} bp")
 
-            # Detect SNPs
-            def find_snps(ref_seq, var_seq):
-                return [(i, ref_nuc, var_nuc)
-                        for i, (ref_nuc, var_nuc) in enumerate(zip(ref_seq, var_seq))
-                        if ref_nuc != var_nuc]
-
-            snps = find_snps(reference_seq, variant_seq)
-            snp_positions = [pos for pos, _, _ in snps]
+            if motif:
+                st.subheader("Motif Search")
+                try:
+                    # The reference is indexed (suffix array) on the first search only, then mapped from disk
+                    motif_records, motif_positions = index_upload(ref_file).find(motif)
+                except ValueError as error:
+                    st.warning(str(error))
+                else:
+                    # The rest of the page analyses the first record only
+                    motif_positions = motif_positions[motif_records == 0]
+                    st.write(f"{len(motif_positions)} occurrence(s) of {motif.upper()} in the reference (forward strand)")
+                    if len(motif_positions):
+                        st.write(", ".join(str(position) for position in motif_positions[:50].tolist())
+                                 + (" ..." if len(motif_positions) > 50 else ""))
+
+            # Detect SNPs (and indels, when the genomes are aligned first)
+            if align_genomes:
+                (snp_positions, ref_bases, alt_bases), insertions, deletions = call_variants(reference_seq, variant_seq)
+            else:
+                snp_positions, ref_bases, alt_bases = find_snps(reference_seq, variant_seq)
+                insertions, deletions = [], []
 
             st.subheader("SNP Detection")
-            st.write(f"Total SNPs Found: {len(snps)}")
+            st.write(f"Total SNPs Found: {len(snp_positions)}")
+
+            if align_genomes:
+                col1, col2 = st.columns(2)
+                col1.metric("Insertions", len(insertions))
+                col2.metric("Deletions", len(deletions))
+                if insertions or deletions:
+                    indels = ([{"Type": "Insertion", "Reference Position": pos, "Bases": bases} for pos, bases in insertions] +
+                              [{"Type": "Deletion", "Reference Position": pos, "Bases": bases} for pos, bases in deletions])
+                    st.table(sorted(indels, key=lambda indel: indel["Reference Position"]))
 
             # Visualizations
             st.subheader("Data Analysis")
@@ -185,11 +227,45 @@ def app():
 
             with col2:
                 st.markdown("#### SNP Type Proportion")
-                fig2, ax2 = plt.subplots()
-                ax2.pie([60, 40], labels=["Transitions", "Transversions"], autopct='%1.1f%%',
-                        colors=['#00FFCC', '#006666'])
-                ax2.set_title("SNP Types")
-                st.pyplot(fig2)
+                transitions, transversions = count_ts_tv(ref_bases, alt_bases)
+                if transitions + transversions:
+                    fig2, ax2 = plt.subplots()
+                    ax2.pie([transitions, transversions], labels=["Transitions", "Transversions"], autopct='%1.1f%%',
+                            colors=['#00FFCC', '#006666'])
+                    ax2.set_title("SNP Types")
+                    st.pyplot(fig2)
+                else:
+                    st.info("No A/C/G/T substitutions to classify.")
+
+                ratio = ts_tv_ratio(ref_bases, alt_bases)
+                st.write(f"Ts/Tv Ratio: {ratio:.2f}" if ratio is not None else "Ts/Tv Ratio: n/a")
+
+                st.markdown("#### Substitution Matrix")
+                matrix = substitution_matrix(ref_bases, alt_bases)
+                st.table({f"→ {alt}": {f"{ref} →": int(matrix[i, j]) for i, ref in enumerate(BASES)}
+                          for j, alt in enumerate(BASES)})
+
+            # Sliding-window property profile of the longest reference ORFs, one row per ORF
+            st.markdown(f"#### Reference ORF {orf_profile.capitalize()} Profiles")
+            orfs, profiles = orf_profiles(reference_seq, min_length=100, profiles=(orf_profile,))
+            rows = profiles[orf_profile]
+            if rows:
+                longest = np.argsort([-len(peptide) for peptide in orfs["peptide"]], kind="stable")[:MAX_PROFILED_ORFS]
+                if len(rows) > MAX_PROFILED_ORFS:
+                    st.caption(f"Showing the {MAX_PROFILED_ORFS} longest of {len(rows)} ORFs.")
+                grid = np.full((len(longest), max(len(rows[i]) for i in longest)), np.nan)
+                for row, i in enumerate(longest):
+                    grid[row, :len(rows[i])] = rows[i]
+                fig3, ax3 = plt.subplots(figsize=(10, max(2, len(longest) * 0.25)))
+                image = ax3.imshow(grid, aspect="auto", interpolation="nearest", cmap="coolwarm")
+                ax3.set_yticks(range(len(longest)))
+                ax3.set_yticklabels([f"{orfs['strand'][i]}{orfs['start'][i]}-{orfs['end'][i]}" for i in longest],
+                                    fontsize=6)
+                ax3.set_xlabel("Residue (window start)")
+                fig3.colorbar(image, ax=ax3, label=orf_profile)
+                st.pyplot(fig3)
+            else:
+                st.info("No ORFs of at least 100 amino acids in the reference genome.")
 
             st.markdown(
                 """
@@ -202,6 +278,12 @@ def app():
     else:
         st.sidebar.warning("Upload Reference and Variant FASTA Files.")
 
+    with st.sidebar.expander("Genome Cache"):
+        stats = genome_cache.stats()
+        st.write(f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']:.0%}")
+        st.write(f"Entries: {stats['entries']} | Size: {stats['bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.0f} MB")
+        st.write(f"Evictions: {stats['evictions']}")
+
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,145 @@
+'''
+Six-frame translation and open reading frame (ORF) search.
+
+The codon index of every position in the genome is computed once per strand (a sliding 16*a + 4*b + c
+over base codes), and each reading frame is then just a stride-3 view of that array. Stop and start
+codons are located with vectorized scans, and each stop is paired with the first start after the
+previous in-frame stop using np.searchsorted, so no frame is ever re-translated in Python.
+
+Coordinates are 0-based, half-open and always on the forward strand; an ORF's range includes its stop codon.
+'''
+
+import numpy as np
+
+from genetic_codes import INVALID_CODON, STANDARD_TABLE_ID, codon_index, get_genetic_code
+from packed_sequence import PackedSequence
+
+DEFAULT_START_CODONS = ("ATG",)
+
+# Accepts DNA or RNA, upper or lower case; 4 marks anything that is not a base
+NUCLEOTIDE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _bases in enumerate(("Aa", "Cc", "Gg", "TtUu")):
+    for _base in _bases:
+        NUCLEOTIDE_CODES[ord(_base)] = _code
+
+FRAMES = [("+", 0), ("+", 1), ("+", 2), ("-", 0), ("-", 1), ("-", 2)]
+
+
+def _codes(sequence):
+    if isinstance(sequence, PackedSequence):
+        return sequence.codes()  # Same 2-bit codes, 4 for ambiguous bases
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii", errors="replace")
+    return NUCLEOTIDE_CODES[np.frombuffer(sequence, dtype=np.uint8)]
+
+
+def _reverse_complement_codes(codes):
+    # A<->T and C<->G are 3 - code; ambiguous bases stay ambiguous
+    return np.where(codes == 4, 4, 3 - codes)[::-1].astype(np.uint8)
+
+
+def sliding_codon_indices(codes):
+    """Returns the codon index starting at every position (length n - 2); INVALID_CODON where any base is ambiguous."""
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.int16)
+    wide = codes.astype(np.int16)
+    indices = 16 * wide[:-2] + 4 * wide[1:-1] + wide[2:]
+    indices[(codes[:-2] == 4) | (codes[1:-1] == 4) | (codes[2:] == 4)] = INVALID_CODON
+    return indices
+
+
+def six_frame_translation(sequence, genetic_code=STANDARD_TABLE_ID):
+    """
+    Translates all six reading frames.
+
+    :param sequence: DNA or RNA as str or bytes-like.
+    :param genetic_code: NCBI table id or GeneticCode.
+    :return: A dict mapping (strand, frame) to a one-letter protein string ('*' = stop, 'X' = ambiguous codon).
+    """
+    one_letter = get_genetic_code(genetic_code).one_letter
+    codes = _codes(sequence)
+    strands = {"+": sliding_codon_indices(codes), "-": sliding_codon_indices(_reverse_complement_codes(codes))}
+    return {(strand, frame): one_letter[strands[strand][frame::3]].tobytes().decode("ascii")
+            for strand, frame in FRAMES}
+
+
+def _frame_orfs(frame_codons, is_stop, start_mask, min_length):
+    # Returns (first codon, stop codon) index pairs within one frame
+    stops = np.flatnonzero(is_stop[frame_codons])
+    previous_stops = np.concatenate(([-1], stops))[:-1]
+    if start_mask is None:
+        starts = previous_stops + 1
+    else:
+        start_positions = np.flatnonzero(start_mask[frame_codons])
+        slot = np.searchsorted(start_positions, previous_stops + 1)
+        has_start = slot < len(start_positions)
+        starts = np.full(len(stops), -1, dtype=np.int64)
+        starts[has_start] = start_positions[slot[has_start]]
+        valid = has_start & (starts < stops)
+        starts, stops = starts[valid], stops[valid]
+    keep = (stops - starts) >= min_length
+    return starts[keep], stops[keep]
+
+
+def find_orfs(sequence, min_length=30, start_codons=DEFAULT_START_CODONS, genetic_code=STANDARD_TABLE_ID):
+    """
+    Finds open reading frames on both strands.
+
+    :param sequence: DNA or RNA as str or bytes-like.
+    :param min_length: Minimum ORF length in amino acids (stop codon not counted).
+    :param start_codons: Codons that may start an ORF, e.g. ("ATG", "GTG", "TTG"), or "table" for the
+                         genetic code's own start codons. None gives stop-to-stop ORFs.
+    :param genetic_code: NCBI table id or GeneticCode.
+    :return: A dict of columns: strand, frame, start, end (numpy arrays) and peptide (list of
+             one-letter strings without the stop), sorted by start position.
+    """
+    code = get_genetic_code(genetic_code)
+    codes = _codes(sequence)
+    n = len(codes)
+    start_mask = None
+    if start_codons == "table":
+        start_mask = code.is_start
+    elif start_codons:
+        start_mask = np.zeros(INVALID_CODON + 1, dtype=bool)
+        start_mask[[codon_index(codon) for codon in start_codons]] = True
+
+    strands = {"+": sliding_codon_indices(codes), "-": sliding_codon_indices(_reverse_complement_codes(codes))}
+    columns = {"strand": [], "frame": [], "start": [], "end": []}
+    peptides = []
+    for strand, frame in FRAMES:
+        frame_codons = strands[strand][frame::3]
+        first, stop = _frame_orfs(frame_codons, code.is_stop, start_mask, min_length)
+        begin = frame + 3 * first
+        finish = frame + 3 * (stop + 1)
+        if strand == "-":
+            begin, finish = n - finish, n - begin
+        columns["strand"].append(np.full(len(first), strand))
+        columns["frame"].append(np.full(len(first), frame, dtype=np.int8))
+        columns["start"].append(begin)
+        columns["end"].append(finish)
+        letters = code.one_letter[frame_codons]
+        peptides.extend(letters[a:b].tobytes().decode("ascii") for a, b in zip(first.tolist(), stop.tolist()))
+
+    orfs = {name: np.concatenate(parts) for name, parts in columns.items()}
+    order = np.argsort(orfs["start"], kind="stable")
+    orfs = {name: values[order] for name, values in orfs.items()}
+    orfs["peptide"] = [peptides[i] for i in order.tolist()]
+    return orfs
+
+
+# Benchmark on the bundled genomes
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+
+    for path in ("data/reference-NC_045512.fasta", "data/BA.3.1.fasta"):
+        genome = read_first_sequence(path)
+        runs = 20
+        translate = timeit.timeit(lambda: six_frame_translation(genome), number=runs) / runs
+        search = timeit.timeit(lambda: find_orfs(genome, min_length=100), number=runs) / runs
+        orfs = find_orfs(genome, min_length=100)
+        longest = max(range(len(orfs["peptide"])), key=lambda i: len(orfs["peptide"][i]))
+        print(f"{path}: {len(genome):,} bp | six-frame {translate * 1000:.2f} ms | ORFs >= 100 aa: "
+              f"{len(orfs['start'])} in {search * 1000:.2f} ms | longest {orfs['strand'][longest]} "
+              f"{orfs['start'][longest]}-{orfs['end'][longest]} ({len(orfs['peptide'][longest])} aa)")
@@ -0,0 +1,273 @@
+'''
+2-bit packed DNA/RNA sequences.
+
+A PackedSequence stores four bases per byte (A=0, C=1, G=2, T/U=3, first base in the high bits), a quarter
+of the memory of a str or a uint8 array. Everything that is not A/C/G/T/U (N, IUPAC codes, gaps) is kept
+in a side table of runs (start, end, byte), so runs of Ns, the usual case in assemblies, cost a few bytes
+each. The ambiguity mask of any range is rebuilt from the runs with np.searchsorted. Lowercase bases are
+stored as uppercase.
+
+Slicing with step 1 returns a view sharing the same buffers (O(1)), and transcription only flips the
+T/U flag: transcribe() is a view that reads 3 as 'U' instead of 'T'. Sequences are immutable.
+
+The rest of the code base accepts a PackedSequence wherever it accepts a str: text-based paths take
+to_array() (ASCII bytes) and code-based paths (orf_finder, protein_synthesis) take codes() directly.
+'''
+
+import numpy as np
+
+AMBIGUOUS = 4
+
+# ASCII byte -> 2-bit code; AMBIGUOUS for anything kept in the run table
+BASE_CODES = np.full(256, AMBIGUOUS, dtype=np.uint8)
+for _code, _bases in enumerate(("Aa", "Cc", "Gg", "TtUu")):
+    for _base in _bases:
+        BASE_CODES[ord(_base)] = _code
+
+DNA_LETTERS = np.frombuffer(b'ACGT', dtype=np.uint8)
+RNA_LETTERS = np.frombuffer(b'ACGU', dtype=np.uint8)
+
+# Complement of the non-ACGT letters that have one (IUPAC); everything else complements to itself
+_IUPAC_COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in ("RY", "KM", "BV", "DH", "ry", "km", "bv", "dh"):
+    _IUPAC_COMPLEMENT[ord(_a)], _IUPAC_COMPLEMENT[ord(_b)] = ord(_b), ord(_a)
+
+# Packed byte -> its four codes, and -> its four letters
+_UNPACK = ((np.arange(256, dtype=np.uint8)[:, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3).astype(np.uint8)
+_DNA_QUADS = DNA_LETTERS[_UNPACK]
+_RNA_QUADS = RNA_LETTERS[_UNPACK]
+
+# Bases packed per block, which bounds the temporary memory of packing a large genome
+BLOCK_SIZE = 1 << 22
+
+
+def _as_ascii(sequence):
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii", errors="replace")
+    if isinstance(sequence, np.ndarray):
+        return sequence.astype(np.uint8, copy=False).ravel()
+    return np.frombuffer(sequence, dtype=np.uint8)
+
+
+def _pack_codes(codes):
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def _contains(ascii_bytes, letters):
+    return any((ascii_bytes == letter).any() for letter in letters)
+
+
+def _runs(ascii_bytes, positions):
+    # Maximal runs of identical bytes at the given sorted positions, as (starts, ends, bytes)
+    if not len(positions):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+    values = ascii_bytes[positions]
+    breaks = np.flatnonzero((np.diff(positions) != 1) | (values[1:] != values[:-1])) + 1
+    starts = positions[np.concatenate(([0], breaks))]
+    ends = positions[np.concatenate((breaks - 1, [len(positions) - 1]))] + 1
+    return starts.astype(np.int64), ends.astype(np.int64), values[np.concatenate(([0], breaks))]
+
+
+class PackedSequence:
+    """Immutable 2-bit packed nucleotide sequence (see the module docstring)."""
+
+    __slots__ = ("_packed", "_run_starts", "_run_ends", "_run_bytes", "_start", "_length", "is_rna")
+
+    def __init__(self, packed, run_starts, run_ends, run_bytes, start, length, is_rna):
+        # Use from_sequence; this constructor only wires up (possibly shared) buffers
+        self._packed = packed
+        self._run_starts = run_starts
+        self._run_ends = run_ends
+        self._run_bytes = run_bytes
+        self._start = start
+        self._length = length
+        self.is_rna = is_rna
+
+    @classmethod
+    def from_sequence(cls, sequence, rna=None):
+        """
+        Packs a sequence given as str, bytes-like, ASCII uint8 array or PackedSequence.
+
+        :param rna: Whether code 3 reads as U; by default True if the sequence contains U but no T.
+        """
+        if isinstance(sequence, PackedSequence):
+            return sequence if rna is None or rna == sequence.is_rna else sequence._with(is_rna=rna)
+        ascii_bytes = _as_ascii(sequence)
+        if rna is None:
+            rna = _contains(ascii_bytes, b"Uu") and not _contains(ascii_bytes, b"Tt")
+        packed = np.empty(-(-len(ascii_bytes) // 4), dtype=np.uint8)
+        ambiguous = []
+        for start in range(0, len(ascii_bytes), BLOCK_SIZE):
+            codes = BASE_CODES[ascii_bytes[start:start + BLOCK_SIZE]]
+            block_ambiguous = np.flatnonzero(codes == AMBIGUOUS)
+            codes[block_ambiguous] = 0
+            packed[start // 4:(start + len(codes) + 3) // 4] = _pack_codes(codes)
+            ambiguous.append(block_ambiguous + start)
+        positions = np.concatenate(ambiguous) if ambiguous else np.empty(0, dtype=np.int64)
+        runs = _runs(ascii_bytes, positions)
+        for array in (packed, *runs):
+            array.flags.writeable = False
+        return cls(packed, *runs, 0, len(ascii_bytes), bool(rna))
+
+    def _with(self, start=None, length=None, is_rna=None):
+        return PackedSequence(self._packed, self._run_starts, self._run_ends, self._run_bytes,
+                              self._start if start is None else start,
+                              self._length if length is None else length,
+                              self.is_rna if is_rna is None else is_rna)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def nbytes(self):
+        """Bytes held by the underlying buffers (shared with every view of them)."""
+        return self._packed.nbytes + self._run_starts.nbytes + self._run_ends.nbytes + self._run_bytes.nbytes
+
+    @property
+    def buffers(self):
+        """(packed, run_starts, run_ends, run_bytes) of the whole underlying sequence, e.g. for serialization."""
+        return self._packed, self._run_starts, self._run_ends, self._run_bytes
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self._length)
+            if step == 1:
+                return self._with(start=self._start + start, length=max(stop - start, 0))
+            return PackedSequence.from_sequence(self.to_array()[item], rna=self.is_rna)
+        index = item + self._length if item < 0 else item
+        if not 0 <= index < self._length:
+            raise IndexError("PackedSequence index out of range")
+        return chr(self[index:index + 1].to_array()[0])
+
+    def _visible_runs(self):
+        # Runs overlapping the view, clipped and shifted to view coordinates
+        end = self._start + self._length
+        first = np.searchsorted(self._run_ends, self._start, side="right")
+        last = np.searchsorted(self._run_starts, end, side="left")
+        starts = np.maximum(self._run_starts[first:last], self._start) - self._start
+        ends = np.minimum(self._run_ends[first:last], end) - self._start
+        return starts, ends, self._run_bytes[first:last]
+
+    @staticmethod
+    def _run_positions(starts, ends):
+        # Every position covered by the runs, in order
+        lengths = ends - starts
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def ambiguous_mask(self):
+        """Returns a boolean array marking the bases that are not A/C/G/T/U."""
+        mask = np.zeros(self._length, dtype=bool)
+        mask[self._run_positions(*self._visible_runs()[:2])] = True
+        return mask
+
+    @property
+    def has_ambiguous(self):
+        starts, _, _ = self._visible_runs()
+        return len(starts) > 0
+
+    def codes(self, ambiguous=AMBIGUOUS):
+        """Returns the 2-bit codes (A=0, C=1, G=2, T/U=3) as uint8, with `ambiguous` at non-ACGT positions."""
+        codes = self._unpack(_UNPACK)
+        starts, ends, _ = self._visible_runs()
+        if len(starts):
+            codes[self._run_positions(starts, ends)] = ambiguous
+        return codes
+
+    def _unpack(self, quads):
+        # Looks up the view's packed bytes in a 256 x 4 table and trims to the view
+        first_byte = self._start // 4
+        last_byte = -(-(self._start + self._length) // 4)
+        offset = self._start - 4 * first_byte
+        return quads[self._packed[first_byte:last_byte]].reshape(-1)[offset:offset + self._length]
+
+    def to_array(self):
+        """Returns the sequence as an ASCII uint8 array (a new array)."""
+        letters = self._unpack(_RNA_QUADS if self.is_rna else _DNA_QUADS)
+        starts, ends, run_bytes = self._visible_runs()
+        if len(starts):
+            letters[self._run_positions(starts, ends)] = np.repeat(run_bytes, ends - starts)
+        return letters
+
+    def to_bytes(self):
+        return self.to_array().tobytes()
+
+    def __bytes__(self):
+        return self.to_bytes()
+
+    def __str__(self):
+        return self.to_bytes().decode("ascii")
+
+    def __array__(self, dtype=None, copy=None):
+        letters = self.to_array()
+        return letters if dtype is None else letters.astype(dtype)
+
+    def __repr__(self):
+        preview = str(self[:20]) + ("..." if self._length > 20 else "")
+        return f"PackedSequence({preview!r}, length={self._length}, rna={self.is_rna})"
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            return self.is_rna == other.is_rna and len(self) == len(other) and self.to_bytes() == other.to_bytes()
+        if isinstance(other, str):
+            return str(self) == other
+        if isinstance(other, (bytes, bytearray)):
+            return self.to_bytes() == bytes(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.is_rna, self.to_bytes()))
+
+    def transcribe(self):
+        """DNA -> RNA without copying: a view that reads code 3 as U."""
+        return self._with(is_rna=True)
+
+    def back_transcribe(self):
+        """RNA -> DNA without copying: a view that reads code 3 as T."""
+        return self._with(is_rna=False)
+
+    def reverse_complement(self):
+        """Returns the reverse complement as a new PackedSequence (IUPAC codes are complemented too)."""
+        letters = (RNA_LETTERS if self.is_rna else DNA_LETTERS)[3 - self.codes(ambiguous=0)]
+        starts, ends, run_bytes = self._visible_runs()
+        if len(starts):
+            letters[self._run_positions(starts, ends)] = np.repeat(_IUPAC_COMPLEMENT[run_bytes], ends - starts)
+        return PackedSequence.from_sequence(letters[::-1], rna=self.is_rna)
+
+
+def read_packed_sequence(source):
+    """Reads the first record of a FASTA file (path, bytes or file-like) into a PackedSequence."""
+    from fasta_reader import read_first_sequence
+
+    return PackedSequence.from_sequence(read_first_sequence(source))
+
+
+# Memory benchmark on a large genome built from the bundled reference
+if __name__ == "__main__":
+    import timeit
+    import tracemalloc
+
+    from fasta_reader import read_first_sequence
+
+    genome = read_first_sequence("data/reference-NC_045512.fasta").tobytes()
+    for copies, label in ((1, "SARS-CoV-2"), (1000, "SARS-CoV-2 x 1000")):
+        text = genome * copies
+        # An assembly-like gap of Ns every 100 kb
+        text = b"".join(text[i:i + 100_000] + b"N" * 500 for i in range(0, len(text), 100_000)).decode("ascii")
+
+        tracemalloc.start()
+        packed = PackedSequence.from_sequence(text)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert str(packed) == text and str(packed.transcribe()) == text.replace("T", "U")
+
+        pack = timeit.timeit(lambda: PackedSequence.from_sequence(text), number=3) / 3
+        unpack = timeit.timeit(packed.to_array, number=3) / 3
+        view = timeit.timeit(lambda: packed[1000:-1000].transcribe(), number=1000) / 1000
+        replace = timeit.timeit(lambda: text.replace("T", "U"), number=3) / 3
+        print(f"{label:>18}: {len(text):>12,} bp | str {len(text) / 1e6:8.2f} MB | packed {packed.nbytes / 1e6:7.2f} MB "
+              f"({len(text) / packed.nbytes:.2f}x smaller, peak while packing {peak / 1e6:.1f} MB) | pack "
+              f"{pack * 1000:7.1f} ms | unpack {unpack * 1000:6.1f} ms | transcribe: str.replace {replace * 1000:6.2f} ms, "
+              f"view {view * 1e6:.1f} µs")
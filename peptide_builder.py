@@ -0,0 +1,184 @@
+'''
+Peptide assembly: one peptide-bonded RDKit molecule from a translated protein.
+
+Each residue is parsed once from a backbone-first SMILES (N, C-alpha, side chain, carbonyl C, =O, OH) and
+cached as a fragment with its C-terminal OH removed. A chain is built by inserting fragments into a single
+RWMol and bonding each new N to the previous carbonyl C, so extending a chain costs one fragment copy and
+one bond, never a re-parse. The last residue keeps its OH (free C-terminus) when the molecule is finalized.
+
+Net charge is the sum of the side-chain charges in amino_acid_data.amino_acid_properties (termini not counted).
+'''
+
+from functools import lru_cache
+from io import BytesIO
+
+from rdkit import Chem
+from rdkit.Chem import Descriptors, Draw, rdDepictor, rdMolDescriptors
+
+from amino_acid_data import amino_acid_properties
+from residues import one_to_three_letter, to_one_letter
+
+# L-amino acids written N first and C(=O)O last, so every fragment has the same backbone atom layout
+residue_smiles = {
+    "A": "N[C@@H](C)C(=O)O",
+    "R": "N[C@@H](CCCNC(N)=N)C(=O)O",
+    "N": "N[C@@H](CC(N)=O)C(=O)O",
+    "D": "N[C@@H](CC(=O)O)C(=O)O",
+    "C": "N[C@@H](CS)C(=O)O",
+    "E": "N[C@@H](CCC(=O)O)C(=O)O",
+    "Q": "N[C@@H](CCC(N)=O)C(=O)O",
+    "G": "NCC(=O)O",
+    "H": "N[C@@H](Cc1c[nH]cn1)C(=O)O",
+    "I": "N[C@@H]([C@@H](C)CC)C(=O)O",
+    "L": "N[C@@H](CC(C)C)C(=O)O",
+    "K": "N[C@@H](CCCCN)C(=O)O",
+    "M": "N[C@@H](CCSC)C(=O)O",
+    "F": "N[C@@H](Cc1ccccc1)C(=O)O",
+    "P": "N1[C@@H](CCC1)C(=O)O",
+    "S": "N[C@@H](CO)C(=O)O",
+    "T": "N[C@@H]([C@H](O)C)C(=O)O",
+    "W": "N[C@@H](Cc1c[nH]c2ccccc12)C(=O)O",
+    "Y": "N[C@@H](Cc1ccc(O)cc1)C(=O)O",
+    "V": "N[C@@H](C(C)C)C(=O)O",
+    "U": "N[C@@H](C[SeH])C(=O)O",
+}
+
+# Chains longer than this are not depicted (2D layout cost grows quickly); properties are still available
+MAX_DRAWN_RESIDUES = 60
+
+_N_INDEX = 0
+
+
+@lru_cache(maxsize=None)
+def residue_fragment(aa):
+    """
+    Returns the cached fragment of one residue: the amino acid without its C-terminal OH.
+    The N is atom 0 and the carbonyl C is atom -2.
+    """
+    try:
+        molecule = Chem.MolFromSmiles(residue_smiles[aa])
+    except KeyError:
+        raise ValueError(f"Cannot build residue {aa!r}. Supported: {''.join(residue_smiles)}.") from None
+    # Kekulized once here: kekulizing the aromatic rings of the assembled chain is superlinear in its size
+    Chem.Kekulize(molecule, clearAromaticFlags=True)
+    fragment = Chem.RWMol(molecule)
+    fragment.RemoveAtom(molecule.GetNumAtoms() - 1)
+    return fragment.GetMol()
+
+
+class PeptideBuilder:
+    """Grows one peptide-bonded molecule residue by residue."""
+
+    def __init__(self, sequence=""):
+        self.residues = []
+        self._chain = Chem.RWMol()
+        self._carbonyl = None  # Index of the last residue's carbonyl C
+        self.extend(sequence)
+
+    def append(self, aa):
+        """Adds one residue (one-letter code) at the C-terminus."""
+        fragment = residue_fragment(aa)
+        offset = self._chain.GetNumAtoms()
+        self._chain.InsertMol(fragment)
+        if self._carbonyl is not None:
+            self._chain.AddBond(self._carbonyl, offset + _N_INDEX, Chem.BondType.SINGLE)
+        self._carbonyl = offset + fragment.GetNumAtoms() - 2
+        self.residues.append(aa)
+
+    def extend(self, sequence):
+        """Adds residues given as three-letter names ("Met Ala") or one-letter codes ("MA")."""
+        for aa in to_one_letter(sequence):
+            self.append(aa)
+
+    def __len__(self):
+        return len(self.residues)
+
+    @property
+    def sequence(self):
+        return "".join(self.residues)
+
+    def molecule(self):
+        """Returns the sanitized peptide (with a free C-terminal OH) as a new Mol; the builder stays extendable."""
+        peptide = Chem.RWMol(self._chain)
+        if self._carbonyl is not None:
+            hydroxyl = peptide.AddAtom(Chem.Atom(8))
+            peptide.AddBond(self._carbonyl, hydroxyl, Chem.BondType.SINGLE)
+        peptide = peptide.GetMol()
+        Chem.SanitizeMol(peptide)
+        return peptide
+
+
+def build_peptide(sequence):
+    """Returns one peptide-bonded Mol for a protein given as three-letter names or one-letter codes."""
+    return PeptideBuilder(sequence).molecule()
+
+
+def net_charge(sequence):
+    """Sum of the side-chain charges from amino_acid_properties; residues without an entry count as 0."""
+    return sum(amino_acid_properties.get(one_to_three_letter.get(aa), {}).get('Charge', 0)
+               for aa in to_one_letter(sequence))
+
+
+def peptide_properties(sequence, molecule=None):
+    """Returns residue count, molecular weight (Da), molecular formula and net charge of a peptide."""
+    if molecule is None:
+        molecule = build_peptide(sequence)
+    return {
+        "residues": len(to_one_letter(sequence)),
+        "molecular_weight": Descriptors.MolWt(molecule),
+        "formula": rdMolDescriptors.CalcMolFormula(molecule),
+        "net_charge": net_charge(sequence),
+    }
+
+
+def draw_peptide(molecule, size=(900, 450), max_residues=MAX_DRAWN_RESIDUES, residue_count=None):
+    """
+    Returns a PNG of the whole peptide as bytes, or None if the chain has more than max_residues residues.
+    residue_count defaults to the number of peptide N-C-alpha-C backbone units found in the molecule.
+    """
+    if residue_count is None:
+        residue_count = len(molecule.GetSubstructMatches(Chem.MolFromSmarts("NCC(=O)")))
+    if residue_count > max_residues:
+        return None
+    depiction = Chem.Mol(molecule)
+    rdDepictor.Compute2DCoords(depiction)
+    buffer = BytesIO()
+    Draw.MolToImage(depiction, size=size).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _build_peptide_smiles(sequence):
+    # Re-parsing approach: concatenate residue SMILES and parse the whole chain, kept for benchmarking.
+    residues = to_one_letter(sequence)
+    smiles = "".join(residue_smiles[aa][:-1] for aa in residues[:-1]) + residue_smiles[residues[-1]]
+    return Chem.MolFromSmiles(smiles)
+
+
+# Benchmark of build time against chain length
+if __name__ == "__main__":
+    import random
+    import timeit
+
+    rng = random.Random(0)
+    standard = "ACDEFGHIKLMNPQRSTVWY"
+    assert Chem.MolToSmiles(build_peptide("Met Gly")) == Chem.MolToSmiles(Chem.MolFromSmiles("CSCC[C@H](N)C(=O)NCC(=O)O"))
+
+    for length in (10, 50, 100, 500, 1000, 5000):
+        sequence = "".join(rng.choice(standard) for _ in range(length))
+        molecule = build_peptide(sequence)
+        assert Chem.MolToSmiles(molecule) == Chem.MolToSmiles(_build_peptide_smiles(sequence))
+        runs = 5
+        build = timeit.timeit(lambda: build_peptide(sequence), number=runs) / runs
+        parse = timeit.timeit(lambda: _build_peptide_smiles(sequence), number=runs) / runs
+
+        # Growing a chain one residue at a time, rebuilding versus extending
+        growing = sequence[:min(length, 100)]
+        rebuild = timeit.timeit(lambda: [_build_peptide_smiles(growing[:i]) for i in range(1, len(growing) + 1)],
+                                number=1)
+        builder = PeptideBuilder()
+        extend = timeit.timeit(lambda: [builder.append(aa) for aa in growing], number=1)
+
+        properties = peptide_properties(sequence, molecule)
+        print(f"{length:>5} aa | build {build * 1000:8.2f} ms | SMILES parse {parse * 1000:8.2f} ms | grow "
+              f"{len(growing)}: re-parse {rebuild * 1000:7.1f} ms, extend {extend * 1000:5.2f} ms | "
+              f"{properties['formula']} {properties['molecular_weight']:.1f} Da, charge {properties['net_charge']:+d}")
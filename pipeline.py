@@ -1,11 +1,198 @@
+import codecs
+import time
+import tracemalloc
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def read_chunks(file_like, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields text chunks from a text or binary file-like object.
+
+    Binary input is decoded as UTF-8 incrementally, so a multi-byte character split across two
+    reads is never broken.
+    """
+    decoder = None
+    while True:
+        chunk = file_like.read(chunk_size)
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                yield text
+        elif chunk:
+            yield chunk
+        if not chunk:
+            return
+
+
+class StageStats:
+    """Cumulative measurements for one pipeline stage."""
+
+    def __init__(self, index, stage, name=None):
+        self.index = index
+        self.name = name or type(stage).__name__
+        self.calls = 0
+        self.wall_time = 0.0
+        self.inclusive_time = 0.0  # Streaming only: wall time including the upstream stages
+        self.items_in = 0
+        self.items_out = 0
+        self.peak_bytes = None  # Only measured by execute(); streamed stages interleave their allocations
+
+    def as_dict(self):
+        return {
+            "index": self.index,
+            "stage": self.name,
+            "calls": self.calls,
+            "wall_time_s": self.wall_time,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+def _count_items(data):
+    try:
+        return len(data)
+    except TypeError:
+        return 0
+
+
 class Pipeline:
-    def __init__(self):
+    def __init__(self, profile=False):
         self.stages = []
+        self.profile = profile
+        self.stage_stats = []
+        # Streaming only: reading and decoding the input, timed apart so it is not charged to the first stage
+        self.input_stats = StageStats(-1, None, name="input")
 
     def add(self, stage):
         self.stages.append(stage)
-    
+        self._sync_stats()
+
+    def _sync_stats(self):
+        # stages is a public list that may be changed directly; keep one StageStats per stage, in order
+        del self.stage_stats[len(self.stages):]
+        for index, stage in enumerate(self.stages):
+            if index == len(self.stage_stats):
+                self.stage_stats.append(StageStats(index, stage))
+            elif self.stage_stats[index].name != type(stage).__name__:
+                self.stage_stats[index] = StageStats(index, stage)
+        return self.stage_stats
+
     def execute(self, input):
+        if self.profile:
+            return self._execute_profiled(input)
         for stage in self.stages:
             input = stage.process(input)
         return input
+
+    def _execute_profiled(self, input):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            for stage, stats in zip(self.stages, self._sync_stats()):
+                items_in = _count_items(input)
+                baseline = tracemalloc.get_traced_memory()[0]
+                if started_tracing:
+                    # A tracer started by the caller keeps its peak; peak_bytes is then an upper bound
+                    tracemalloc.reset_peak()
+                start = time.perf_counter()
+                input = stage.process(input)
+                stats.wall_time += time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                stats.peak_bytes = max(stats.peak_bytes or 0, peak)
+                stats.calls += 1
+                stats.items_in += items_in
+                stats.items_out += _count_items(input)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return input
+
+    def execute_iter(self, chunks):
+        """
+        Runs the pipeline lazily over an iterable of text chunks and returns an iterator of output chunks.
+
+        A stage that defines process_stream(chunks) receives the whole chunk iterator and must yield its
+        output; stateful stages use this to carry context across chunk boundaries. Any other stage is
+        applied to each chunk independently through process(), which is correct for character-local
+        stages such as all of the text-to-DNA stages.
+        """
+        upstream = None
+        stage_stats = self._sync_stats()
+        if self.profile and stage_stats:
+            chunks = self._profile_stream(iter(chunks), self.input_stats, None)
+            upstream = self.input_stats
+        for stage, stats in zip(self.stages, stage_stats):
+            if hasattr(stage, "process_stream"):
+                chunks = stage.process_stream(chunks)
+            else:
+                chunks = map(stage.process, chunks)
+            if self.profile:
+                chunks = self._profile_stream(chunks, stats, upstream)
+                upstream = stats
+        return chunks
+
+    def _profile_stream(self, chunks, stats, upstream):
+        # Time spent pulling a chunk includes every upstream stage, which is exactly the upstream stage's own
+        # inclusive time over the same pull; subtracting that leaves this stage's exclusive time
+        stats.calls += 1
+        while True:
+            upstream_before = upstream.inclusive_time if upstream else 0.0
+            upstream_items = upstream.items_out if upstream else 0
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                upstream_elapsed = (upstream.inclusive_time - upstream_before) if upstream else 0.0
+                stats.inclusive_time += elapsed
+                stats.wall_time += max(elapsed - upstream_elapsed, 0.0)
+            if upstream:
+                stats.items_in += upstream.items_out - upstream_items
+            stats.items_out += _count_items(chunk)
+            yield chunk
+
+    def execute_stream(self, file_like, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Streams a file-like object through the pipeline in constant memory, yielding output chunks."""
+        return self.execute_iter(read_chunks(file_like, chunk_size))
+
+    def profile_report(self):
+        """
+        Returns the per-stage measurements as a list of dicts (empty counters unless profile=True). After a
+        profiled stream the first entry, index -1, is the time spent reading the input.
+        """
+        stats = self._sync_stats()
+        if self.input_stats.calls:
+            stats = [self.input_stats] + stats
+        return [entry.as_dict() for entry in stats]
+
+    def reset_profile(self):
+        """Clears the per-stage measurements."""
+        self.stage_stats = [StageStats(index, stage) for index, stage in enumerate(self.stages)]
+        self.input_stats = StageStats(-1, None, name="input")
+
+    def prometheus_metrics(self, prefix="pipeline_stage"):
+        """Returns the per-stage measurements in the Prometheus text exposition format."""
+        metrics = [
+            ("calls_total", "counter", "Stage invocations.", "calls"),
+            ("seconds_total", "counter", "Wall time spent in the stage.", "wall_time_s"),
+            ("items_in_total", "counter", "Items (characters or list entries) consumed.", "items_in"),
+            ("items_out_total", "counter", "Items (characters or list entries) produced.", "items_out"),
+            ("peak_bytes", "gauge", "Peak traced allocation during one call.", "peak_bytes"),
+        ]
+        report = self.profile_report()
+        lines = []
+        for suffix, kind, help_text, key in metrics:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for row in report:
+                if row[key] is not None:
+                    lines.append(f'{name}{{index="{row["index"]}",stage="{row["stage"]}"}} {row[key]}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,145 @@
+'''
+Residue property profiles from amino_acid_data.
+
+Every property in amino_acid_properties (Hydrophobicity is the Kyte-Doolittle hydropathy scale, Charge the
+side-chain charge, Size the residue mass in Da) is compiled into a 256-entry lookup array indexed by the
+one-letter code's ASCII byte, so a protein becomes a property array with a single fancy-index lookup.
+
+Sliding windows come from one cumulative sum: the window starting at i is c[i + w] - c[i]. Residues without
+an entry (X, stop, Sec, ...) are left out of window averages rather than counted as zero.
+
+Many proteins (e.g. every ORF of a genome) are profiled at once by concatenating them, taking the cumulative
+sum once and skipping the windows that straddle two proteins.
+'''
+
+import numpy as np
+
+from amino_acid_data import amino_acid_properties
+from residues import three_to_one_letter, to_one_letter
+
+# Profile name -> (property in amino_acid_properties, window statistic)
+PROFILES = {
+    "hydropathy": ("Hydrophobicity", "mean"),
+    "charge": ("Charge", "sum"),
+    "size": ("Size", "mean"),
+}
+DEFAULT_WINDOW = 9  # Kyte and Doolittle's recommended window for surface/interior prediction
+
+PROPERTY_TABLES = {}
+for _property in {name for name, _ in PROFILES.values()}:
+    PROPERTY_TABLES[_property] = np.full(256, np.nan)
+    for _three, _values in amino_acid_properties.items():
+        PROPERTY_TABLES[_property][ord(three_to_one_letter[_three])] = _values[_property]
+    PROPERTY_TABLES[_property].flags.writeable = False
+
+
+def _as_codes(protein):
+    # One-letter ASCII bytes for a protein given as three-letter names, one-letter codes or bytes
+    if isinstance(protein, (bytes, bytearray, memoryview)):
+        return np.frombuffer(protein, dtype=np.uint8)
+    return np.frombuffer(to_one_letter(protein).encode("ascii", errors="replace"), dtype=np.uint8)
+
+
+def property_values(protein, property_name="Hydrophobicity"):
+    """Returns one value per residue (NaN for residues without an entry) as a float array."""
+    return PROPERTY_TABLES[property_name][_as_codes(protein)]
+
+
+def window_profile(values, window=DEFAULT_WINDOW, statistic="mean"):
+    """
+    Returns the sliding-window mean or sum of per-residue values (length n - window + 1, empty if n < window).
+    NaN values are skipped; a mean over a window without any value is NaN.
+    """
+    known = ~np.isnan(values)
+    totals = np.concatenate(([0.0], np.cumsum(np.where(known, values, 0.0))))
+    window_totals = totals[window:] - totals[:-window] if len(values) >= window else np.empty(0)
+    if statistic == "sum":
+        return window_totals
+    counts = np.concatenate(([0], np.cumsum(known)))
+    window_counts = counts[window:] - counts[:-window] if len(values) >= window else np.empty(0, dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_totals / window_counts, np.nan)
+
+
+def protein_profile(protein, window=DEFAULT_WINDOW, profiles=tuple(PROFILES)):
+    """Returns {profile name: window profile} for one protein; profile i covers residues i to i + window - 1."""
+    codes = _as_codes(protein)
+    return {name: window_profile(PROPERTY_TABLES[PROFILES[name][0]][codes], window, PROFILES[name][1])
+            for name in profiles}
+
+
+def batch_profiles(proteins, window=DEFAULT_WINDOW, profiles=tuple(PROFILES)):
+    """
+    Profiles many proteins in one pass.
+
+    :param proteins: Iterable of proteins (three-letter names, one-letter codes or bytes).
+    :param window: Window length in residues.
+    :param profiles: Names from PROFILES.
+    :return: {profile name: list of per-protein window profiles}; the arrays are views into one buffer.
+    """
+    encoded = [_as_codes(protein) for protein in proteins]
+    if not encoded:
+        return {name: [] for name in profiles}
+    lengths = np.array([len(codes) for codes in encoded], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    codes = np.concatenate(encoded)
+
+    # Windows of protein k start at starts[k] .. ends[k] - window; the ones straddling two proteins are skipped
+    profile_lengths = np.maximum(lengths - window + 1, 0)
+    profile_starts = np.cumsum(profile_lengths) - profile_lengths
+    window_starts = np.arange(profile_lengths.sum()) + np.repeat(starts - profile_starts, profile_lengths)
+
+    result = {}
+    for name in profiles:
+        property_name, statistic = PROFILES[name]
+        flat = window_profile(PROPERTY_TABLES[property_name][codes], window, statistic)[window_starts]
+        result[name] = np.split(flat, profile_starts[1:])
+    return result
+
+
+def orf_profiles(sequence, window=DEFAULT_WINDOW, min_length=100, genetic_code=1, profiles=tuple(PROFILES)):
+    """
+    Finds the ORFs of a genome (see orf_finder.find_orfs) and profiles all their peptides in one batch.
+    Returns (orfs, profiles) with profiles[name][i] belonging to ORF i.
+    """
+    from orf_finder import find_orfs
+
+    orfs = find_orfs(sequence, min_length=min_length, genetic_code=genetic_code)
+    return orfs, batch_profiles([peptide.encode("ascii") for peptide in orfs["peptide"]], window, profiles)
+
+
+def _hydropathy_loop(protein, window=DEFAULT_WINDOW):
+    # Per-window Python loop over the property dict, kept for benchmarking.
+    names = protein.split()
+    profile = []
+    for i in range(len(names) - window + 1):
+        values = [amino_acid_properties[name]['Hydrophobicity'] for name in names[i:i + window]
+                  if name in amino_acid_properties]
+        profile.append(sum(values) / len(values) if values else float("nan"))
+    return profile
+
+
+# Benchmark on every ORF of the bundled reference genome
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+    from residues import one_to_three_letter
+
+    genome = read_first_sequence("data/reference-NC_045512.fasta")
+    orfs, profiles = orf_profiles(genome, min_length=30)
+    peptides = orfs["peptide"]
+    three_letter = [" ".join(one_to_three_letter.get(aa, "Xaa") for aa in peptide) for peptide in peptides]
+    assert all(np.allclose(profile, _hydropathy_loop(names), equal_nan=True)
+               for profile, names in zip(profiles["hydropathy"], three_letter))
+
+    runs = 5
+    loop = timeit.timeit(lambda: [_hydropathy_loop(names) for names in three_letter], number=1)
+    single = timeit.timeit(lambda: [protein_profile(peptide, profiles=("hydropathy",)) for peptide in peptides],
+                           number=runs) / runs
+    batch = timeit.timeit(lambda: batch_profiles(peptides, profiles=("hydropathy",)), number=runs) / runs
+    everything = timeit.timeit(lambda: batch_profiles(peptides), number=runs) / runs
+    residues = sum(len(peptide) for peptide in peptides)
+    print(f"{len(peptides)} ORFs, {residues:,} residues | hydropathy: loop {loop * 1000:.1f} ms, per protein "
+          f"{single * 1000:.2f} ms, batch {batch * 1000:.2f} ms | all profiles batch {everything * 1000:.2f} ms")
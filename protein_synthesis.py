@@ -1,31 +1,77 @@
 '''
-Loop through RNA Sequence: The function iterates through the RNA sequence three nucleotides at a time to process each codon.
+Codon Tables: Each NCBI genetic code is compiled once, in genetic_codes, into flat 65-entry lookup arrays
+indexed by 16*a + 4*b + c, where a, b and c are the 2-bit codes of the codon's bases (A=0, C=1, G=2, U=3).
+Index 64 stands for an unrecognized or incomplete codon. The standard code (table 1) is the default.
 
-Stop Codon Check: If a stop codon is found (i.e., the codon maps to 'Stop'), the function sets the stop_codon_present flag to True and breaks out of the loop.
+Translation: The RNA is mapped to base codes with one table lookup, every codon index is computed at once
+with NumPy, and the whole sequence is translated with a single fancy-index lookup.
 
-Return Value: The function now returns a tuple consisting of the translated protein sequence and a boolean flag indicating whether a stop codon was encountered.
+Stop Codon Check: Translation ends at the first stop codon (stop_codon_present is True) or at the first
+unrecognized codon (stop_codon_present is False), exactly like the original codon-by-codon loop.
+
+Return Value: The function returns a tuple consisting of the translated protein sequence (space-separated
+three-letter names, or one-letter codes with one_letter=True; see residues for conversions) and a boolean flag
+indicating whether a stop codon was encountered.
 '''
 
-def translate_rna_to_protein(rna_sequence):
-    """Translates RNA sequence into protein based on codon mapping."""
-    codon_to_amino_acid = {
-        'UUU': 'Phe', 'UUC': 'Phe', 'UUA': 'Leu', 'UUG': 'Leu',
-        'UCU': 'Ser', 'UCC': 'Ser', 'UCA': 'Ser', 'UCG': 'Ser',
-        'UAU': 'Tyr', 'UAC': 'Tyr', 'UAA': 'Stop', 'UAG': 'Stop',
-        'UGU': 'Cys', 'UGC': 'Cys', 'UGA': 'Stop', 'UGG': 'Trp',
-        'CUU': 'Leu', 'CUC': 'Leu', 'CUA': 'Leu', 'CUG': 'Leu',
-        'CCU': 'Pro', 'CCC': 'Pro', 'CCA': 'Pro', 'CCG': 'Pro',
-        'CAU': 'His', 'CAC': 'His', 'CAA': 'Gln', 'CAG': 'Gln',
-        'CGU': 'Arg', 'CGC': 'Arg', 'CGA': 'Arg', 'CGG': 'Arg',
-        'AUU': 'Ile', 'AUC': 'Ile', 'AUA': 'Ile', 'AUG': 'Met',
-        'ACU': 'Thr', 'ACC': 'Thr', 'ACA': 'Thr', 'ACG': 'Thr',
-        'AAU': 'Asn', 'AAC': 'Asn', 'AAA': 'Lys', 'AAG': 'Lys',
-        'AGU': 'Ser', 'AGC': 'Ser', 'AGA': 'Arg', 'AGG': 'Arg',
-        'GUU': 'Val', 'GUC': 'Val', 'GUA': 'Val', 'GUG': 'Val',
-        'GCU': 'Ala', 'GCC': 'Ala', 'GCA': 'Ala', 'GCG': 'Ala',
-        'GAU': 'Asp', 'GAC': 'Asp', 'GAA': 'Glu', 'GAG': 'Glu',
-        'GGU': 'Gly', 'GGC': 'Gly', 'GGA': 'Gly', 'GGG': 'Gly'
-    }
+import numpy as np
+
+from genetic_codes import INVALID_CODON, RNA_BASES, STANDARD_CODE, STANDARD_TABLE_ID, get_genetic_code
+from packed_sequence import PackedSequence
+
+# The standard code, kept under its original names
+codon_to_amino_acid = STANDARD_CODE.codon_table()
+AMINO_ACIDS = STANDARD_CODE.amino_acids
+IS_STOP = STANDARD_CODE.is_stop
+ENDS_TRANSLATION = STANDARD_CODE.ends_translation
+ONE_LETTER = STANDARD_CODE.one_letter
+
+# ASCII byte -> base code; 4 marks anything that is not an (uppercase) RNA base
+RNA_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(RNA_BASES):
+    RNA_CODES[ord(_base)] = _code
+
+
+def _as_bytes(sequence):
+    if isinstance(sequence, str):
+        # One byte per character keeps codon boundaries where the original string slicing put them
+        return sequence.encode("ascii", errors="replace")
+    return sequence
+
+
+def codon_indices(rna_sequence):
+    """
+    Returns the codon index (0-63, or INVALID_CODON) of every complete codon in reading frame 0.
+    A PackedSequence is read through its 2-bit codes, i.e. as its transcript.
+    """
+    if isinstance(rna_sequence, PackedSequence):
+        codes = rna_sequence.codes()
+    else:
+        codes = RNA_CODES[np.frombuffer(_as_bytes(rna_sequence), dtype=np.uint8)]
+    codons = codes[:len(codes) - len(codes) % 3].reshape(-1, 3).astype(np.int16)
+    indices = 16 * codons[:, 0] + 4 * codons[:, 1] + codons[:, 2]
+    indices[(codons == 4).any(axis=1)] = INVALID_CODON
+    return indices
+
+
+def translate_rna_to_protein(rna_sequence, genetic_code=STANDARD_TABLE_ID, one_letter=False):
+    """
+    Translates RNA sequence into protein using an NCBI genetic code (table id or GeneticCode).
+    The protein is returned as three-letter names ("Met Ala"), or as one-letter codes ("MA") if one_letter is True.
+    """
+    code = get_genetic_code(genetic_code)
+    indices = codon_indices(rna_sequence)
+    ends = np.flatnonzero(code.ends_translation[indices])
+    end = ends[0] if len(ends) else len(indices)
+    stop_codon_present = bool(end < len(indices) and code.is_stop[indices[end]])
+    # Any trailing partial codon is dropped, as in the original loop
+    if one_letter:
+        return code.one_letter[indices[:end]].tobytes().decode("ascii"), stop_codon_present
+    return ' '.join(code.amino_acids[indices[:end]].tolist()), stop_codon_present
+
+
+def _translate_rna_to_protein_loop(rna_sequence):
+    # The original codon-by-codon implementation, kept for benchmarking.
     protein = []
     stop_codon_present = False
     for i in range(0, len(rna_sequence), 3):
@@ -36,7 +82,31 @@ def translate_rna_to_protein(rna_sequence):
                 break
             protein.append(codon_to_amino_acid[codon])
         else:
-            break  # Handle case where the length of RNA is not a multiple of 3 or unrecognized codon
+            break
     return ' '.join(protein), stop_codon_present
 
 
+# Benchmark on the bundled genomes read as RNA
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+
+    for path in ("data/reference-NC_045512.fasta", "data/BA.3.1.fasta"):
+        rna = read_first_sequence(path).tobytes().decode("ascii").replace("T", "U")
+        assert translate_rna_to_protein(rna) == _translate_rna_to_protein_loop(rna)
+
+        # Translate every codon of frame 0, ignoring stops, so the whole genome is exercised
+        def loop_full_frame():
+            return [codon_to_amino_acid.get(rna[i:i+3]) for i in range(0, len(rna) - 2, 3)]
+
+        def vectorized_full_frame():
+            return AMINO_ACIDS[codon_indices(rna)]
+
+        assert vectorized_full_frame().tolist() == loop_full_frame()
+
+        runs = 20
+        loop = timeit.timeit(loop_full_frame, number=runs) / runs
+        vectorized = timeit.timeit(vectorized_full_frame, number=runs) / runs
+        print(f"{path}: {len(rna):,} nt | loop {loop * 1000:.2f} ms | vectorized {vectorized * 1000:.2f} ms "
+              f"| speedup {loop / vectorized:.1f}x")
@@ -0,0 +1,46 @@
+'''
+Amino acid residue names and conversions.
+
+Proteins travel through the app in two spellings: translate_rna_to_protein returns space-separated
+three-letter names ("Met Ala Stop"), while drawing and the lookup arrays use one-letter codes ("MA*").
+Both directions are table lookups, shared by protein_synthesis, genetic_codes and draw_molecules.
+
+Unknown residues become 'X' (one-letter) or None (three-letter).
+'''
+
+three_to_one_letter = {
+    'Ala': 'A', 'Arg': 'R', 'Asn': 'N', 'Asp': 'D', 'Cys': 'C',
+    'Gln': 'Q', 'Glu': 'E', 'Gly': 'G', 'His': 'H', 'Ile': 'I',
+    'Leu': 'L', 'Lys': 'K', 'Met': 'M', 'Phe': 'F', 'Pro': 'P',
+    'Ser': 'S', 'Thr': 'T', 'Trp': 'W', 'Tyr': 'Y', 'Val': 'V',
+    'Sec': 'U', 'Pyl': 'O', 'Stop': '*'
+}
+one_to_three_letter = {one: three for three, one in three_to_one_letter.items()}
+
+UNKNOWN = 'X'
+
+
+def is_three_letter(protein):
+    """True if a protein string is written as three-letter names ("Met Ala"), False for one-letter codes ("MA")."""
+    names = protein.split()
+    return bool(names) and all(name in three_to_one_letter for name in names)
+
+
+def to_one_letter(protein):
+    """
+    Returns a protein as a one-letter string.
+
+    :param protein: Three-letter names (space-separated string or sequence of names) or one-letter codes.
+    """
+    if isinstance(protein, str):
+        if not is_three_letter(protein):
+            return protein
+        protein = protein.split()
+    return ''.join(three_to_one_letter.get(name, name if len(name) == 1 else UNKNOWN) for name in protein)
+
+
+def to_three_letter(protein):
+    """Returns a protein (one-letter string or three-letter names) as a list of three-letter names."""
+    if isinstance(protein, str) and is_three_letter(protein):
+        return protein.split()
+    return [one_to_three_letter.get(letter) for letter in to_one_letter(protein)]
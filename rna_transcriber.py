@@ -1,19 +1,22 @@
-import dna_generator  # Import the module
+import sys
+
+from compiled_pipeline import build_text_to_dna_pipeline, compile_pipeline
+from transcription import main, transcribe
+
 
 def transcribe_dna_to_rna(dna_sequence):
     """
     Transcribes a DNA sequence into an RNA sequence by replacing every "T" with "U".
-    
-    :param dna_sequence: A string representing the DNA sequence.
-    :return: A string representing the RNA sequence.
+
+    :param dna_sequence: DNA as str, bytes-like or PackedSequence (see transcription.transcribe).
+    :return: The RNA sequence, of the same kind as the input.
     """
-    rna_sequence = dna_sequence.replace("T", "U")
-    return rna_sequence
+    return transcribe(dna_sequence)
 
 def save_to_file(content, file_name="rna_sequence.txt"):
     """
     Saves the given content to a text file.
-    
+
     :param content: The text to save.
     :param file_name: The name of the file to save the content in.
     """
@@ -22,18 +25,21 @@ def save_to_file(content, file_name="rna_sequence.txt"):
     print(f"Content saved to {file_name}")
 
 if __name__ == "__main__":
+    # With arguments, convert FASTA files in fixed memory, e.g. `python rna_transcriber.py transcribe in.fasta`
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
     # Define an input string
     input_string = "hi"
-    
+
     # Flag to control saving to file
     save_to_file_flag = True  # Change to False if you do not want to save the output to a file
-    
-    # Use the `run_pipeline` function from the imported `dna_generator` module to process the input string
-    # and generate a DNA sequence.
-    dna_sequence = dna_generator.run_pipeline(input_string, save_to_file=False)
-    
+
+    # Generate a DNA sequence from the input string with the compiled text-to-DNA pipeline
+    dna_sequence = compile_pipeline(build_text_to_dna_pipeline()).execute(input_string)
+
     print("DNA Sequence:", dna_sequence)
-    
+
     # Transcribe the DNA sequence into RNA
     rna_sequence = transcribe_dna_to_rna(dna_sequence)
     print("RNA Sequence:", rna_sequence)
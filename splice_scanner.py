@@ -0,0 +1,153 @@
+'''
+Vectorized GT...AG intron scanner.
+
+Donor (GT) and acceptor (AG) dinucleotides are located with one comparison over the whole sequence.
+Every donor is then paired with the first acceptor that satisfies the splice model (np.searchsorted),
+which gives each donor a successor: the first donor after its intron ends. Scanning left to right and
+taking the leftmost intron each time, exactly as re.finditer(r'GT(.*?)AG') does, is a walk along these
+successor links; it is extracted with pointer doubling in O(n log n) array operations instead of one
+Python iteration (and one match object) per intron.
+
+With the default model the result is identical to the regex. Coordinates are 0-based and half-open;
+an intron includes its GT and AG. Only upper-case bases are recognized, as with the regex.
+'''
+
+import numpy as np
+
+from packed_sequence import PackedSequence
+
+MIN_INTRON_LENGTH = 4  # GT + AG
+DEFAULT_BRANCH_POINT_WINDOW = (18, 40)
+
+_GT = np.frombuffer(b'GT', dtype=np.uint8)
+_AG = np.frombuffer(b'AG', dtype=np.uint8)
+
+
+def _as_bytes(sequence):
+    if isinstance(sequence, PackedSequence):
+        return sequence.to_array()
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii", errors="replace")
+    return np.frombuffer(sequence, dtype=np.uint8)
+
+
+def dinucleotide_positions(sequence, dinucleotide):
+    """Returns the start of every (possibly overlapping) occurrence of a two-base motif."""
+    data = _as_bytes(sequence)
+    first, second = _as_bytes(dinucleotide)
+    return np.flatnonzero((data[:-1] == first) & (data[1:] == second))
+
+
+def _last_adenine(data, acceptors, window):
+    # Position of the last 'A' at most window[0] bases upstream of each acceptor (-1 if none)
+    positions = np.arange(len(data))
+    last_a = np.maximum.accumulate(np.where(data == ord('A'), positions, -1)) if len(data) else positions
+    lookup = acceptors - window[0]
+    found = np.full(len(acceptors), -1, dtype=np.int64)
+    inside = lookup >= 0
+    found[inside] = last_a[lookup[inside]]
+    return found
+
+
+def scan_introns(sequence, min_length=MIN_INTRON_LENGTH, max_length=None, branch_point=None):
+    """
+    Finds non-overlapping GT...AG introns, leftmost first.
+
+    :param sequence: DNA as str, bytes-like or PackedSequence.
+    :param min_length: Minimum intron length including GT and AG (at least 4).
+    :param max_length: Maximum intron length; a donor whose first acceptable AG is further away is skipped.
+    :param branch_point: None, True for DEFAULT_BRANCH_POINT_WINDOW, or a (min, max) distance window: the
+                         intron needs an 'A' between min and max bases upstream of the acceptor AG,
+                         downstream of the donor GT.
+    :return: (starts, ends) as int64 arrays.
+    """
+    if min_length < MIN_INTRON_LENGTH:
+        raise ValueError(f"min_length must be at least {MIN_INTRON_LENGTH}")
+    if branch_point is True:
+        branch_point = DEFAULT_BRANCH_POINT_WINDOW
+
+    data = _as_bytes(sequence)
+    donors = dinucleotide_positions(data, _GT)
+    acceptors = dinucleotide_positions(data, _AG)
+
+    # First acceptor at least min_length - 2 bases after each donor
+    slot = np.searchsorted(acceptors, donors + (min_length - 2))
+    if branch_point is not None:
+        last_a = _last_adenine(data, acceptors, branch_point)
+        acceptable = last_a >= acceptors - branch_point[1]
+        acceptors, last_a = acceptors[acceptable], last_a[acceptable]
+        slot = np.searchsorted(acceptors, donors + (min_length - 2))
+        # last_a never decreases along the acceptors, so "branch point after the donor" is also a suffix
+        slot = np.maximum(slot, np.searchsorted(last_a, donors + 2))
+
+    paired = slot < len(acceptors)
+    ends = np.full(len(donors), -1, dtype=np.int64)
+    ends[paired] = acceptors[slot[paired]] + 2
+    if max_length is not None:
+        paired &= (ends - donors) <= max_length
+
+    # Successor of each donor: the first donor after its intron, or simply the next donor if it has none.
+    # Index len(donors) is the terminal node.
+    terminal = len(donors)
+    successor = np.arange(1, terminal + 2)
+    successor[:terminal][paired] = np.searchsorted(donors, ends[paired])
+    successor[terminal] = terminal
+
+    # Collect every node reachable from donor 0 by pointer doubling
+    on_path = np.zeros(terminal + 1, dtype=bool)
+    on_path[0] = True
+    while True:
+        on_path[successor[on_path]] = True
+        if (successor == terminal).all():
+            break
+        successor = successor[successor]
+
+    chosen = on_path[:terminal] & paired
+    return donors[chosen], ends[chosen]
+
+
+def exon_coordinates(length, intron_starts, intron_ends):
+    """Returns the non-empty gaps between sorted, non-overlapping introns as (starts, ends) arrays."""
+    starts = np.concatenate(([0], intron_ends)).astype(np.int64)
+    ends = np.concatenate((intron_starts, [length])).astype(np.int64)
+    keep = starts < ends
+    return starts[keep], ends[keep]
+
+
+def splice(sequence, intron_starts, intron_ends):
+    """Returns the sequence with the introns removed, built with a single buffer copy."""
+    data = _as_bytes(sequence)
+    # +1 at every intron start and -1 at every end marks the intronic bases after a cumulative sum
+    marks = np.zeros(len(data) + 1, dtype=np.int64)
+    np.add.at(marks, intron_starts, 1)
+    np.add.at(marks, intron_ends, -1)
+    spliced = data[np.cumsum(marks[:-1]) == 0]
+    if isinstance(sequence, PackedSequence):
+        return PackedSequence.from_sequence(spliced, rna=sequence.is_rna)
+    return spliced.tobytes().decode("ascii") if isinstance(sequence, str) else spliced.tobytes()
+
+
+def _find_introns_regex(dna_sequence):
+    # The original lazy-regex scan from biosynthesis_simulator, kept for benchmarking.
+    import re
+    return [(match.start(), match.end()) for match in re.finditer(r'GT(.*?)AG', dna_sequence)]
+
+
+# Benchmark against the regex scan on random DNA
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    for length in (10_000, 1_000_000, 10_000_000):
+        sequence = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, size=length)].tobytes().decode("ascii")
+        starts, ends = scan_introns(sequence)
+        assert list(zip(starts.tolist(), ends.tolist())) == _find_introns_regex(sequence)
+
+        runs = 3
+        regex = timeit.timeit(lambda: _find_introns_regex(sequence), number=runs) / runs
+        vectorized = timeit.timeit(lambda: scan_introns(sequence), number=runs) / runs
+        modelled = timeit.timeit(lambda: scan_introns(sequence, min_length=60, max_length=10_000,
+                                                      branch_point=True), number=runs) / runs
+        constrained = len(scan_introns(sequence, min_length=60, max_length=10_000, branch_point=True)[0])
+        print(f"{length:>11,} bp | {len(starts):>9,} introns | regex {regex * 1000:8.1f} ms | "
+              f"vectorized {vectorized * 1000:7.1f} ms | constrained ({constrained:,}) {modelled * 1000:7.1f} ms")
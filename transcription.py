@@ -0,0 +1,255 @@
+'''
+Transcription, complement and reverse complement on bytes.
+
+Every operation is a 256-entry byte table built once with bytes.maketrans. Without an output buffer the
+result is a new object of the input's kind (str -> str, bytes -> bytes, bytearray -> bytearray) made
+by a single translate call. With out=..., the table is applied with np.take straight into the caller's
+writable buffer (bytearray, memoryview, mmap, NumPy array), and passing the input itself as out works
+in place. PackedSequence inputs are handled by their own O(1) views (see packed_sequence).
+
+Complements follow IUPAC, so ambiguity codes map to their complements (R<->Y, K<->M, B<->V, D<->H) and
+N, S, W and gaps map to themselves; case is preserved.
+
+The command-line interface converts FASTA files of any size in fixed memory: transcription and
+complement stream blocks through the table and leave header lines untouched. The reverse complement
+walks each record backwards block by block (os.pread) and re-wraps the output lines.
+
+    python transcription.py transcribe genome.fasta -o transcript.fasta
+    python transcription.py reverse-complement genome.fasta --width 70 > minus_strand.fasta
+'''
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from packed_sequence import PackedSequence
+
+BLOCK_SIZE = 1 << 20
+DEFAULT_WIDTH = 60
+
+_COMPLEMENT_FROM = b"ACGTUacgtuRYKMBVDHrykmbvdh"
+TRANSCRIBE_TABLE = bytes.maketrans(b"Tt", b"Uu")
+BACK_TRANSCRIBE_TABLE = bytes.maketrans(b"Uu", b"Tt")
+COMPLEMENT_TABLE = bytes.maketrans(_COMPLEMENT_FROM, b"TGCAAtgcaaYRMKVBHDyrmkvbhd")
+RNA_COMPLEMENT_TABLE = bytes.maketrans(_COMPLEMENT_FROM, b"UGCAAugcaaYRMKVBHDyrmkvbhd")
+
+# The same tables as NumPy arrays (for np.take into buffers) and str.translate dicts
+_ARRAYS = {table: np.frombuffer(table, dtype=np.uint8)
+           for table in (TRANSCRIBE_TABLE, BACK_TRANSCRIBE_TABLE, COMPLEMENT_TABLE, RNA_COMPLEMENT_TABLE)}
+_STR_TABLES = {table: {i: chr(byte) for i, byte in enumerate(table) if i != byte} for table in _ARRAYS}
+
+_WHITESPACE = bytes(range(33))
+
+
+def _uint8_view(buffer, writable=False):
+    if isinstance(buffer, np.ndarray):
+        view = buffer.reshape(-1).view(np.uint8)
+    else:
+        view = np.frombuffer(buffer, dtype=np.uint8)
+    if writable and not view.flags.writeable:
+        raise TypeError("out must be a writable buffer (bytearray, memoryview, mmap or NumPy array)")
+    return view
+
+
+def _apply(sequence, table, out=None, reverse=False):
+    if isinstance(sequence, str):
+        if out is not None:
+            raise TypeError("out is only supported for bytes-like input")
+        translated = sequence.translate(_STR_TABLES[table])
+        return translated[::-1] if reverse else translated
+
+    if out is None:
+        if isinstance(sequence, (bytes, bytearray)) and not reverse:
+            return sequence.translate(table)
+        result = np.take(_ARRAYS[table], _uint8_view(sequence)[::-1] if reverse else _uint8_view(sequence))
+        return bytearray(result.tobytes()) if isinstance(sequence, bytearray) else result.tobytes()
+
+    source = _uint8_view(sequence)
+    target = _uint8_view(out, writable=True)
+    if len(target) != len(source):
+        raise ValueError(f"out has {len(target)} bytes, expected {len(source)}")
+    if reverse:
+        # Reading a reversed view of the buffer being written would overwrite bases before they are read
+        source = source[::-1].copy() if np.shares_memory(source, target) else source[::-1]
+    np.take(_ARRAYS[table], source, out=target, mode="clip")  # Indices are bytes, so clipping never happens
+    return out
+
+
+def transcribe(sequence, out=None):
+    """DNA -> RNA (T -> U). See the module docstring for the accepted inputs and out."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.transcribe()
+    return _apply(sequence, TRANSCRIBE_TABLE, out)
+
+
+def back_transcribe(sequence, out=None):
+    """RNA -> DNA (U -> T)."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.back_transcribe()
+    return _apply(sequence, BACK_TRANSCRIBE_TABLE, out)
+
+
+def complement(sequence, out=None, rna=False):
+    """Base-pairing complement (A -> U instead of T if rna is True)."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.reverse_complement()[::-1]
+    return _apply(sequence, RNA_COMPLEMENT_TABLE if rna else COMPLEMENT_TABLE, out)
+
+
+def reverse_complement(sequence, out=None, rna=False):
+    """Reverse complement, i.e. the other strand read 5' to 3'."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.reverse_complement()
+    return _apply(sequence, RNA_COMPLEMENT_TABLE if rna else COMPLEMENT_TABLE, out, reverse=True)
+
+
+class _HeaderTracker:
+    """Finds header-line spans in consecutive blocks of a FASTA stream."""
+
+    def __init__(self):
+        self.line_start = True  # The next byte begins a line
+        self.in_header = False  # Inside a header line that started in an earlier block
+
+    def spans(self, block):
+        spans = []
+        position = 0
+        if self.in_header:
+            end = block.find(b"\n")
+            if end == -1:
+                spans.append((0, len(block)))
+                position = len(block)
+            else:
+                spans.append((0, end))
+                position = end
+                self.in_header = False
+        while position < len(block):
+            if position == 0 and self.line_start and block[:1] == b">":
+                start = 0
+            else:
+                start = block.find(b"\n>", position)
+                if start == -1:
+                    break
+                start += 1
+            end = block.find(b"\n", start)
+            if end == -1:
+                spans.append((start, len(block)))
+                self.in_header = True
+                break
+            spans.append((start, end))
+            position = end
+        if block:
+            self.line_start = block[-1:] == b"\n"
+        return spans
+
+
+def stream_translate(source, destination, table, block_size=BLOCK_SIZE):
+    """Copies a FASTA stream through a byte table block by block, leaving header lines unchanged."""
+    tracker = _HeaderTracker()
+    while True:
+        block = source.read(block_size)
+        if not block:
+            return
+        translated = bytearray(block.translate(table))
+        for start, end in tracker.spans(block):
+            translated[start:end] = block[start:end]
+        destination.write(translated)
+
+
+def _records(descriptor, size, block_size=BLOCK_SIZE):
+    # (header line, sequence start, sequence end) of every record, from a block-wise
+    # scan for '>' at the start of a line
+    starts = []
+    previous = b"\n"
+    for offset in range(0, size, block_size):
+        block = os.pread(descriptor, block_size, offset)
+        if previous == b"\n" and block[:1] == b">":
+            starts.append(offset)
+        position = block.find(b"\n>")
+        while position != -1:
+            starts.append(offset + position + 1)
+            position = block.find(b"\n>", position + 1)
+        previous = block[-1:]
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else size
+        header = b""
+        while not header.endswith(b"\n") and start + len(header) < end:
+            header += os.pread(descriptor, min(block_size, end - start - len(header)), start + len(header))
+            if b"\n" in header:
+                header = header[:header.index(b"\n") + 1]
+        yield header.rstrip(b"\r\n"), start + len(header), end
+
+
+def _wrap(bases, width):
+    # Lines of exactly width bases, each followed by a newline, as one bytes object
+    lines = np.empty((len(bases) // width, width + 1), dtype=np.uint8)
+    lines[:, :width] = np.frombuffer(bases, dtype=np.uint8).reshape(-1, width)
+    lines[:, width] = ord("\n")
+    return lines.tobytes()
+
+
+def stream_reverse_complement(path, destination, width=DEFAULT_WIDTH, rna=False, block_size=BLOCK_SIZE):
+    """
+    Writes the reverse complement of every record of a FASTA file, reading each record backwards one block at
+    a time, so memory use does not depend on the file size. Output lines are wrapped at width (0 for one line).
+    """
+    table = RNA_COMPLEMENT_TABLE if rna else COMPLEMENT_TABLE
+    with open(path, "rb") as handle:
+        descriptor = handle.fileno()
+        for header, start, end in _records(descriptor, os.fstat(descriptor).st_size, block_size):
+            destination.write(header + b"\n")
+            pending = b""  # Bases of the last, incomplete output line
+            for block_end in range(end, start, -block_size):
+                block_start = max(block_end - block_size, start)
+                bases = os.pread(descriptor, block_end - block_start, block_start).translate(table, _WHITESPACE)
+                if not width:
+                    destination.write(bases[::-1])
+                    continue
+                pending += bases[::-1]
+                complete = len(pending) - len(pending) % width
+                destination.write(_wrap(pending[:complete], width))
+                pending = pending[complete:]
+            if pending or not width:
+                destination.write(pending + b"\n")
+
+
+MODES = {
+    "transcribe": TRANSCRIBE_TABLE,
+    "back-transcribe": BACK_TRANSCRIBE_TABLE,
+    "complement": COMPLEMENT_TABLE,
+    "reverse-complement": None,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert FASTA files of any size in fixed memory.")
+    parser.add_argument("mode", choices=list(MODES))
+    parser.add_argument("input", help="FASTA file ('-' for standard input, except for reverse-complement)")
+    parser.add_argument("-o", "--output", help="Output file (default: standard output)")
+    parser.add_argument("--rna", action="store_true", help="Complement A to U instead of T")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH,
+                        help="Line width of reverse-complement output (0 for one line per record)")
+    args = parser.parse_args(argv)
+
+    if args.mode == "reverse-complement" and args.input == "-":
+        parser.error("reverse-complement needs a file path, it reads records backwards")
+    table = RNA_COMPLEMENT_TABLE if args.mode == "complement" and args.rna else MODES[args.mode]
+
+    destination = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        if args.mode == "reverse-complement":
+            stream_reverse_complement(args.input, destination, args.width, args.rna)
+        elif args.input == "-":
+            stream_translate(sys.stdin.buffer, destination, table)
+        else:
+            with open(args.input, "rb") as source:
+                stream_translate(source, destination, table)
+    finally:
+        if args.output:
+            destination.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
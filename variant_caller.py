@@ -0,0 +1,325 @@
+'''
+Alignment-aware variant calling (SNPs, insertions and deletions).
+
+A plain positional comparison treats every base after an indel as a SNP. Here the two genomes are
+aligned first, using a seed-and-extend strategy that stays close to linear time on viral-size genomes:
+
+1. Seeding: k-mers that occur exactly once in both genomes are anchors.
+2. Chaining: anchors are merged into runs along the same diagonal, and the longest collinear chain
+   of runs is kept.
+3. Gap filling: the short stretches between chained runs are aligned with a banded affine-gap DP,
+   so an indel next to a substitution is reported as one event rather than several fragments.
+   Each DP row is computed with NumPy (the in-row insertion term is a running minimum).
+
+Coordinates are 0-based reference positions. Ambiguity codes (N, R, Y, ...) align to anything at
+no cost and are never reported as SNPs. Unmatched overhangs before the first anchor and after
+the last one (partial assemblies, different start offsets) are not called unless trim_ends=False.
+'''
+
+from bisect import bisect_left
+
+import numpy as np
+
+from kmer_counter import kmer_values
+from packed_sequence import AMBIGUOUS, BASE_CODES
+from snp_finder import encode_sequence
+
+DEFAULT_K = 15
+DEFAULT_BAND = 50
+
+# Alignment costs (lower is better); a gap of length L costs GAP_OPEN + GAP_EXTEND * L
+MISMATCH = 4
+GAP_OPEN = 6
+GAP_EXTEND = 1
+
+_INF = 1 << 29
+
+
+def _unique_kmers(codes, k):
+    values, positions = kmer_values(codes, k)
+    unique, first, counts = np.unique(values, return_index=True, return_counts=True)
+    once = counts == 1
+    return unique[once], positions[first[once]]
+
+
+def _match_anchors(ref_kmers, ref_positions, var_codes, k):
+    var_kmers, var_positions = _unique_kmers(var_codes, k)
+    _, ref_idx, var_idx = np.intersect1d(ref_kmers, var_kmers, assume_unique=True, return_indices=True)
+    order = np.argsort(ref_positions[ref_idx], kind="stable")
+    return ref_positions[ref_idx][order], var_positions[var_idx][order]
+
+
+def find_anchors(ref_codes, var_codes, k=DEFAULT_K):
+    """Returns (ref_positions, var_positions) of k-mers unique in both genomes, sorted by reference position."""
+    return _match_anchors(*_unique_kmers(ref_codes, k), var_codes, k)
+
+
+class PreparedReference:
+    """
+    A reference encoded once for many call_variants_prepared calls: its bases, their codes, and the k-mers
+    that occur exactly once in it (sorted) with their positions. The arrays may be views of shared memory.
+    """
+
+    def __init__(self, sequence, codes, kmers, positions, k=DEFAULT_K):
+        self.sequence = sequence
+        self.codes = codes
+        self.kmers = kmers
+        self.positions = positions
+        self.k = k
+
+    @classmethod
+    def from_sequence(cls, ref_seq, k=DEFAULT_K):
+        sequence = encode_sequence(ref_seq)
+        codes = BASE_CODES[sequence]
+        return cls(sequence, codes, *_unique_kmers(codes, k), k)
+
+
+def chain_anchors(ref_positions, var_positions, k=DEFAULT_K):
+    """
+    Merges consecutive anchors on the same diagonal into runs and keeps the longest collinear chain.
+
+    :return: A list of (ref_start, var_start, length) exact-match blocks, increasing in both genomes.
+    """
+    if len(ref_positions) == 0:
+        return []
+    breaks = np.flatnonzero((np.diff(ref_positions) != 1) | (np.diff(var_positions) != 1)) + 1
+    run_starts = np.concatenate(([0], breaks))
+    run_ends = np.concatenate((breaks, [len(ref_positions)]))
+    run_ref = ref_positions[run_starts].tolist()
+    run_var = var_positions[run_starts].tolist()
+    run_len = (run_ends - run_starts + k - 1).tolist()
+
+    # Longest increasing subsequence over variant positions (runs are already sorted by reference)
+    tails, tail_idx = [], []
+    parents = [-1] * len(run_var)
+    for i, v in enumerate(run_var):
+        slot = bisect_left(tails, v)
+        if slot == len(tails):
+            tails.append(v)
+            tail_idx.append(i)
+        else:
+            tails[slot] = v
+            tail_idx[slot] = i
+        parents[i] = tail_idx[slot - 1] if slot else -1
+
+    chain = []
+    i = tail_idx[-1]
+    while i != -1:
+        chain.append((run_ref[i], run_var[i], run_len[i]))
+        i = parents[i]
+    chain.reverse()
+    return chain
+
+
+def _banded_affine_path(a, b, band):
+    # Banded affine-gap alignment (Gotoh) between code arrays a (reference) and b (variant).
+    # Returns the traceback as a list of (op, i, j) with op in "MXID", from the start.
+    la, lb = len(a), len(b)
+    centers = [(i * lb) // la for i in range(la + 1)]
+
+    width = min(lb, band) + 1
+    gap_row = GAP_OPEN + GAP_EXTEND * np.arange(width, dtype=np.int64)
+    gap_row[0] = 0
+    h_rows, e_rows, f_rows = [gap_row], [gap_row.copy()], [np.full(width, _INF, dtype=np.int64)]
+    e_rows[0][0] = _INF
+    los = [0]
+    for i in range(1, la + 1):
+        lo = max(0, centers[i - 1] - band)
+        hi = min(lb, -(-(i * lb) // la) + band)
+        plo, cols = los[-1], np.arange(lo, hi + 1)
+
+        # Previous row laid out over columns lo-1 .. hi
+        prev_h = np.full(hi - lo + 2, _INF, dtype=np.int64)
+        prev_f = np.full(hi - lo + 2, _INF, dtype=np.int64)
+        src_lo, src_hi = max(plo, lo - 1), min(plo + len(h_rows[-1]) - 1, hi)
+        if src_lo <= src_hi:
+            prev_h[src_lo - lo + 1:src_hi - lo + 2] = h_rows[-1][src_lo - plo:src_hi - plo + 1]
+            prev_f[src_lo - lo + 1:src_hi - lo + 2] = f_rows[-1][src_lo - plo:src_hi - plo + 1]
+
+        # Deletions (vertical gaps)
+        f = np.minimum(prev_f[1:] + GAP_EXTEND, prev_h[1:] + GAP_OPEN + GAP_EXTEND)
+        # Substitutions (diagonal)
+        diag = np.full(hi - lo + 1, _INF, dtype=np.int64)
+        first = 1 if lo == 0 else 0
+        ref_base, var_bases = a[i - 1], b[cols[first:] - 1]
+        mismatch = (var_bases != ref_base) & (var_bases != AMBIGUOUS) & (ref_base != AMBIGUOUS)
+        diag[first:] = prev_h[first:-1] + MISMATCH * mismatch
+        h = np.minimum(diag, f)
+        # Insertions (horizontal gaps): a running minimum replaces the left-to-right recurrence
+        e = np.full(hi - lo + 1, _INF, dtype=np.int64)
+        reach = np.minimum.accumulate(h + GAP_OPEN - GAP_EXTEND * cols)
+        e[1:] = GAP_EXTEND * cols[1:] + reach[:-1]
+        h = np.minimum(h, e)
+
+        h_rows.append(h)
+        e_rows.append(e)
+        f_rows.append(f)
+        los.append(lo)
+
+    def cell(rows, i, j):
+        lo = los[i]
+        if lo <= j < lo + len(rows[i]):
+            return rows[i][j - lo]
+        return _INF
+
+    def substitution(i, j):
+        x, y = a[i - 1], b[j - 1]
+        return MISMATCH if x != y and x != AMBIGUOUS and y != AMBIGUOUS else 0
+
+    path = []
+    state, i, j = "H", la, lb
+    while i > 0 or j > 0:
+        if state == "H":
+            score = cell(h_rows, i, j)
+            if i > 0 and j > 0 and cell(h_rows, i - 1, j - 1) + substitution(i, j) == score:
+                path.append(("X" if substitution(i, j) else "M", i - 1, j - 1))
+                i, j = i - 1, j - 1
+            elif score == cell(e_rows, i, j):
+                state = "E"
+            else:
+                state = "F"
+        elif state == "E":
+            path.append(("I", i, j - 1))
+            if cell(e_rows, i, j) == cell(h_rows, i, j - 1) + GAP_OPEN + GAP_EXTEND:
+                state = "H"
+            j -= 1
+        else:
+            path.append(("D", i - 1, j))
+            if cell(f_rows, i, j) == cell(h_rows, i - 1, j) + GAP_OPEN + GAP_EXTEND:
+                state = "H"
+            i -= 1
+    path.reverse()
+    return path
+
+
+class _VariantCollector:
+    """Accumulates SNP columns and merged indel events in reference coordinates."""
+
+    def __init__(self, ref, var):
+        self.ref, self.var = ref, var
+        self.snp_positions = []
+        self.snp_var_positions = []
+        self.insertions = []
+        self.deletions = []
+
+    def _bases(self, seq, start, end):
+        return seq[start:end].tobytes().decode("ascii")
+
+    def add_gap(self, ref_start, ref_end, var_start, var_end, ref_codes, var_codes, band):
+        la, lb = ref_end - ref_start, var_end - var_start
+        if la == 0 and lb == 0:
+            return
+        if la == 0:
+            self.insertions.append((ref_start, self._bases(self.var, var_start, var_end)))
+            return
+        if lb == 0:
+            self.deletions.append((ref_start, self._bases(self.ref, ref_start, ref_end)))
+            return
+
+        a = ref_codes[ref_start:ref_end]
+        b = var_codes[var_start:var_end]
+        if la == lb:
+            mismatches = np.flatnonzero(self.ref[ref_start:ref_end] != self.var[var_start:var_end])
+            if len(mismatches) <= 1:
+                # A lone substitution cannot be beaten by any gapped alignment
+                self.snp_positions.extend((mismatches + ref_start).tolist())
+                self.snp_var_positions.extend((mismatches + var_start).tolist())
+                return
+
+        open_op, open_start, open_bases = None, None, []
+        for op, i, j in _banded_affine_path(a, b, band) + [("M", la, lb)]:
+            if open_op and (op != open_op or (op == "D" and ref_start + i != open_end)):
+                event = (open_start, "".join(open_bases))
+                (self.insertions if open_op == "I" else self.deletions).append(event)
+                open_op = None
+            if op == "X":
+                self.snp_positions.append(ref_start + i)
+                self.snp_var_positions.append(var_start + j)
+            elif op in "ID":
+                if open_op is None:
+                    open_op, open_start, open_bases = op, ref_start + i, []
+                if op == "I":
+                    open_bases.append(chr(self.var[var_start + j]))
+                else:
+                    open_bases.append(chr(self.ref[ref_start + i]))
+                    open_end = ref_start + i + 1
+
+    def result(self):
+        positions = np.asarray(self.snp_positions, dtype=np.int64)
+        var_positions = np.asarray(self.snp_var_positions, dtype=np.int64)
+        unambiguous = (BASE_CODES[self.ref[positions]] != AMBIGUOUS) & (BASE_CODES[self.var[var_positions]] != AMBIGUOUS)
+        positions, var_positions = positions[unambiguous], var_positions[unambiguous]
+        snps = (positions, self.ref[positions], self.var[var_positions])
+        return snps, self.insertions, self.deletions
+
+
+def call_variants(ref_seq, var_seq, k=DEFAULT_K, band=DEFAULT_BAND, trim_ends=True):
+    """
+    Aligns a variant genome to a reference and calls SNPs, insertions and deletions.
+
+    :param ref_seq: The reference sequence (str, bytes-like or uint8 array).
+    :param var_seq: The variant sequence (str, bytes-like or uint8 array).
+    :param k: Seed length for anchors (at most 31).
+    :param band: Half-width of the DP band between anchors.
+    :param trim_ends: If True, unmatched overhangs at either end are not reported as indels.
+    :return: A tuple (snps, insertions, deletions). snps is (positions, ref_bases, alt_bases) as in
+             snp_finder.find_snps; insertions and deletions are lists of (ref_position, bases).
+    """
+    return call_variants_prepared(PreparedReference.from_sequence(ref_seq, k), var_seq, band, trim_ends)
+
+
+def call_variants_prepared(reference, var_seq, band=DEFAULT_BAND, trim_ends=True):
+    """
+    call_variants against a PreparedReference, so scanning many variants encodes the reference and counts its
+    k-mers only once. Seeds are reference.k long.
+    """
+    ref, ref_codes, k = reference.sequence, reference.codes, reference.k
+    var = encode_sequence(var_seq)
+    var_codes = BASE_CODES[var]
+
+    chain = chain_anchors(*_match_anchors(reference.kmers, reference.positions, var_codes, k), k=k)
+    collector = _VariantCollector(ref, var)
+
+    if not chain:
+        if not trim_ends:
+            collector.add_gap(0, len(ref), 0, len(var), ref_codes, var_codes, band)
+        return collector.result()
+
+    cur_r, cur_v = chain[0][0], chain[0][1]
+    if not trim_ends:
+        collector.add_gap(0, cur_r, 0, cur_v, ref_codes, var_codes, band)
+    for r, v, length in chain:
+        # Trim blocks that overlap what has already been aligned
+        shift = max(cur_r - r, cur_v - v, 0)
+        if shift >= length:
+            continue
+        r, v, length = r + shift, v + shift, length - shift
+        collector.add_gap(cur_r, r, cur_v, v, ref_codes, var_codes, band)
+        cur_r, cur_v = r + length, v + length
+    if not trim_ends:
+        collector.add_gap(cur_r, len(ref), cur_v, len(var), ref_codes, var_codes, band)
+    return collector.result()
+
+
+# Benchmark on the bundled SARS-CoV-2 pair
+if __name__ == "__main__":
+    import timeit
+
+    from fasta_reader import read_first_sequence
+    from snp_finder import find_snps
+
+    reference = read_first_sequence("data/reference-NC_045512.fasta")
+    variant = read_first_sequence("data/BA.3.1.fasta")
+
+    runs = 5
+    elapsed = timeit.timeit(lambda: call_variants(reference, variant), number=runs) / runs
+    (positions, _, _), insertions, deletions = call_variants(reference, variant)
+
+    print(f"Reference {len(reference):,} bp, variant {len(variant):,} bp")
+    print(f"Positional comparison: {len(find_snps(reference, variant)[0]):,} SNPs")
+    print(f"Alignment: {len(positions):,} SNPs, {len(insertions)} insertions, {len(deletions)} deletions "
+          f"in {elapsed * 1000:.1f} ms ({len(reference) / elapsed:,.0f} bases/s)")
+    for position, bases in insertions:
+        print(f"  ins {position}: +{bases}")
+    for position, bases in deletions:
+        print(f"  del {position}: -{bases}")